@@ -4,6 +4,8 @@ from .posts import posts_bp
 from .feed import feed_bp
 from .jobs import jobs_bp
 from .messaging import messaging_bp
+from .media import media_bp
+from .uploads import uploads_bp
 
 __all__ = [
     'auth_bp',
@@ -11,5 +13,7 @@ __all__ = [
     'posts_bp',
     'feed_bp',
     'jobs_bp',
-    'messaging_bp'
+    'messaging_bp',
+    'media_bp',
+    'uploads_bp'
 ] 
\ No newline at end of file
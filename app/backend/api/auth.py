@@ -1,15 +1,35 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
-from werkzeug.security import generate_password_hash, check_password_hash
+from flask_jwt_extended import create_access_token, jwt_required, current_user
+from sqlalchemy.exc import IntegrityError
 from models.user import User
 from extensions import db
+from services.passwords import password_hashing, Busy
+from services.identity import token_claims
 import datetime
 import traceback
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/api/auth')
 
+HASHING_RETRY_AFTER = 2  # seconds
+EMAIL_CONSTRAINTS = {'ux_users_email_lower', 'users_email_key'}
+
 # CORS is handled globally in main.py for Render compatibility
 
+def is_email_conflict(db_exc, email):
+    """Whether a signup's unique violation is on the email rather than the username"""
+    diag = getattr(db_exc.orig, 'diag', None)  # psycopg2 names the violated constraint
+    constraint = getattr(diag, 'constraint_name', None)
+    if constraint:
+        return constraint in EMAIL_CONSTRAINTS
+    # No constraint name (e.g. SQLite): ask the email index, on the error path only
+    return User.by_email(email).first() is not None
+
+def hashing_busy():
+    print("[AUTH] Password hashing queue full")
+    response = jsonify(success=False, message='Too many sign-in attempts right now. Please retry shortly.')
+    response.headers['Retry-After'] = str(HASHING_RETRY_AFTER)
+    return response, 503
+
 @auth_bp.route('/signup', methods=['POST'])
 def signup():
     try:
@@ -26,26 +46,37 @@ def signup():
         if not isinstance(username, str) or not isinstance(email, str) or not isinstance(password, str):
             print(f"[SIGNUP ERROR] Invalid types: username={type(username)}, email={type(email)}, password={type(password)}")
             return jsonify({'success': False, 'message': 'Invalid input types'}), 400
-        if User.query.filter_by(email=email).first():
-            print(f"[SIGNUP ERROR] Email already registered: {email}")
-            return jsonify({'success': False, 'message': 'Email already registered'}), 400
-        if User.query.filter_by(username=username).first():
-            print(f"[SIGNUP ERROR] Username already taken: {username}")
-            return jsonify({'success': False, 'message': 'Username already taken'}), 400
+        username, email = username.strip(), email.strip()
+        if '@' in username:
+            # Keeps login's email/username dispatch unambiguous
+            return jsonify({'success': False, 'message': 'Username cannot contain @'}), 400
         if not User.is_password_complex(password):
             print("[SIGNUP ERROR] Password not complex enough")
             return jsonify({'success': False, 'message': 'Password must be at least 8 chars, with upper, lower, digit.'}), 400
         user = User(username=username, email=email)
-        user.set_password(password)
+        try:
+            user.set_password(password)
+        except Busy:
+            return hashing_busy()
+        # Uniqueness (case-insensitive) is enforced by the lower() indexes in the insert itself
         try:
             db.session.add(user)
             db.session.commit()
+        except IntegrityError as db_exc:
+            db.session.rollback()
+            if is_email_conflict(db_exc, email):
+                print(f"[SIGNUP ERROR] Email already registered: {email}")
+                return jsonify({'success': False, 'message': 'Email already registered'}), 400
+            print(f"[SIGNUP ERROR] Username already taken: {username}")
+            return jsonify({'success': False, 'message': 'Username already taken'}), 400
         except Exception as db_exc:
             db.session.rollback()
             print(f"[SIGNUP ERROR] DB Exception: {db_exc}")
             traceback.print_exc()
             return jsonify({'success': False, 'message': 'Database error'}), 500
-        token = create_access_token(identity=str(user.id), expires_delta=datetime.timedelta(days=1))
+        token = create_access_token(
+            identity=str(user.id), additional_claims=token_claims(user), expires_delta=datetime.timedelta(days=1)
+        )
         return jsonify({
             'success': True,
             'message': 'User registered successfully',
@@ -91,17 +122,28 @@ def login():
         identifier = data.get('identifier') or data.get('username') or data.get('email')
         password = data.get('password')
         print(f"[LOGIN DEBUG] identifier: {identifier}, password: {'***' if password else None}")
-        if not identifier or not password:
+        if not isinstance(identifier, str) or not identifier or not password:
             print("[LOGIN ERROR] Missing identifier or password")
             return jsonify(success=False, message='Username/Email and password required'), 400
-        user = User.query.filter((User.email == identifier) | (User.username == identifier)).first()
-        if not user:
-            print(f"[LOGIN ERROR] User not found for identifier: {identifier}")
-        elif not user.check_password(password):
-            print(f"[LOGIN ERROR] Invalid password for user: {identifier}")
-        if not user or not user.check_password(password):
-            return jsonify(success=False, message='Invalid credentials'), 401
-        token = create_access_token(identity=str(user.id), expires_delta=datetime.timedelta(days=1))
+        user = User.by_login(identifier).first()
+        try:
+            if not user:
+                # Hash anyway so unknown accounts answer as slowly as wrong passwords
+                password_hashing.check_password(None, password)
+                print(f"[LOGIN ERROR] User not found for identifier: {identifier}")
+                return jsonify(success=False, message='Invalid credentials'), 401
+            if not user.check_password(password):
+                print(f"[LOGIN ERROR] Invalid password for user: {identifier}")
+                return jsonify(success=False, message='Invalid credentials'), 401
+        except Busy:
+            return hashing_busy()
+        if db.session.is_modified(user):
+            # check_password rehashed with the current policy
+            db.session.commit()
+            print(f"[LOGIN] Rehashed password for user {user.id}")
+        token = create_access_token(
+            identity=str(user.id), additional_claims=token_claims(user), expires_delta=datetime.timedelta(days=1)
+        )
         print(f"[LOGIN SUCCESS] User {user.id} logged in")
         return jsonify(success=True, token=token, user={
             'id': user.id,
@@ -117,12 +159,7 @@ def login():
 @jwt_required()
 def get_profile():
     try:
-        current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
-
-        if not user:
-            return jsonify({'success': False, 'message': 'User not found'}), 404
-
+        user = current_user
         return jsonify({
             'success': True,
             'user': {
@@ -145,7 +182,7 @@ def forgot_password():
             return jsonify({'success': False, 'message': 'Email is required'}), 400
 
         # Check if user exists
-        user = User.query.filter_by(email=email).first()
+        user = User.by_email(email).first()
         if not user:
             # Don't reveal if email exists or not for security
             return jsonify({'success': True, 'message': 'If the email exists, a reset link has been sent'}), 200
@@ -1,5 +1,89 @@
-from flask import Blueprint
+from flask import Blueprint, request, jsonify, current_app
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from models.user import User
+from extensions import db
+from services import timeline, ranking
+from api.posts import posts_response, encode_cursor, decode_cursor
 
-feed_bp = Blueprint('feed', __name__)
- 
-# Routes will be implemented here 
\ No newline at end of file
+feed_bp = Blueprint('feed', __name__, url_prefix='/api')
+
+@feed_bp.route('/feed', methods=['GET'])
+@jwt_required()
+def get_feed():
+    """Home timeline: own posts plus posts from followed users.
+
+    ``sort=latest`` (default) is newest first; paginate with ``cursor`` /
+    ``pagination.next_cursor`` like GET /api/posts. ``sort=top`` scores the
+    newest FEED_RANK_CANDIDATES timeline posts and pages through them with
+    ``page``.
+    """
+    try:
+        user_id = int(get_jwt_identity())
+        per_page = min(request.args.get('per_page', 10, type=int), 50)
+        if request.args.get('sort', 'latest') == 'top':
+            page = max(request.args.get('page', 1, type=int), 1)
+            candidate_ids = timeline.timeline_post_ids(
+                user_id, current_app.config.get('FEED_RANK_CANDIDATES', ranking.DEFAULT_CANDIDATES)
+            )
+            ranked_ids, has_next = ranking.rank_post_ids(
+                user_id, candidate_ids, per_page, (page - 1) * per_page, current_app.config
+            )
+            return posts_response(timeline.hydrate_posts(ranked_ids), {
+                'page': page,
+                'per_page': per_page,
+                'has_next': has_next,
+                'has_prev': page > 1
+            })
+
+        cursor = request.args.get('cursor', '').strip()
+        position = None
+        if cursor:
+            try:
+                position = decode_cursor(cursor, 'created_at', 'desc')
+            except ValueError as e:
+                print(f'[GET /api/feed] Bad cursor: {e}')
+                return jsonify(success=False, message='Invalid cursor.'), 400
+
+        posts, has_next = timeline.read_timeline(user_id, per_page, position)
+        next_cursor = None
+        if has_next and posts:
+            last = posts[-1]
+            next_cursor = encode_cursor('created_at', 'desc', last['created_at'], last['id'])
+
+        return posts_response(posts, {
+            'per_page': per_page,
+            'next_cursor': next_cursor,
+            'has_next': has_next
+        })
+    except Exception as e:
+        print(f'[GET /api/feed] Error: {e}')
+        return jsonify(success=False, message='Failed to fetch feed.'), 500
+
+@feed_bp.route('/users/<int:user_id>/follow', methods=['POST'])
+@jwt_required()
+def follow_user(user_id):
+    try:
+        follower_id = int(get_jwt_identity())
+        if user_id == follower_id:
+            return jsonify(success=False, message='You cannot follow yourself.'), 400
+        if not db.session.query(User.id).filter(User.id == user_id).first():
+            return jsonify(success=False, message='User not found.'), 404
+        timeline.follow(follower_id, user_id)
+        db.session.commit()
+        return jsonify(success=True, following=True, follower_count=timeline.follower_count(user_id)), 200
+    except Exception as e:
+        db.session.rollback()
+        print(f'[POST /api/users/{user_id}/follow] Error: {e}')
+        return jsonify(success=False, message='Failed to follow user.'), 500
+
+@feed_bp.route('/users/<int:user_id>/follow', methods=['DELETE'])
+@jwt_required()
+def unfollow_user(user_id):
+    try:
+        timeline.unfollow(int(get_jwt_identity()), user_id)
+        db.session.commit()
+        return jsonify(success=True, following=False, follower_count=timeline.follower_count(user_id)), 200
+    except Exception as e:
+        db.session.rollback()
+        print(f'[DELETE /api/users/{user_id}/follow] Error: {e}')
+        return jsonify(success=False, message='Failed to unfollow user.'), 500
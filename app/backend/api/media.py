@@ -0,0 +1,68 @@
+from flask import Blueprint, request, jsonify, redirect
+from models.post import Post
+from models.profile import Profile
+from extensions import db
+from services.image_ops import VARIANT_NAMES, DEFAULT_VARIANT
+from services.media_files import send_media
+
+media_bp = Blueprint('media', __name__, url_prefix='/api/media')
+
+# These URLs point at whatever the current avatar/banner is, so only cache
+# briefly; the stored files themselves are cached as immutable
+MEDIA_CACHE_CONTROL = 'public, max-age=300'
+
+# Public URL prefixes of files under the uploads root
+MEDIA_URL_PREFIXES = ('/static/uploads/', '/api/uploads/')
+
+def wants_webp():
+    """Explicit ``format`` wins; otherwise WebP only when the client lists image/webp"""
+    fmt = request.args.get('format')
+    if fmt:
+        return fmt == 'webp'
+    return any(value == 'image/webp' and quality for value, quality in request.accept_mimetypes)
+
+def serve_media_url(url, negotiated=False):
+    if url.startswith(('http://', 'https://')):
+        return redirect(url)
+    for prefix in MEDIA_URL_PREFIXES:
+        if url.startswith(prefix):
+            response = send_media(url[len(prefix):], MEDIA_CACHE_CONTROL)
+            if negotiated:
+                response.vary.add('Accept')
+            return response
+    return jsonify(success=False, message='Media not found.'), 404
+
+def serve_variant(variants, original_url):
+    """Serve the ``size`` variant (thumb/card/full) in WebP or JPEG.
+
+    Images uploaded before variants existed fall back to the original file.
+    """
+    size = request.args.get('size', DEFAULT_VARIANT)
+    if size not in VARIANT_NAMES:
+        return jsonify(success=False, message=f"size must be one of {', '.join(VARIANT_NAMES)}."), 400
+    if request.args.get('format') not in (None, 'webp', 'jpeg'):
+        return jsonify(success=False, message='format must be webp or jpeg.'), 400
+    if variants and size in variants:
+        negotiated = 'format' not in request.args
+        return serve_media_url(variants[size]['webp' if wants_webp() else 'jpeg'], negotiated)
+    if original_url:
+        return serve_media_url(original_url)
+    return jsonify(success=False, message='Media not found.'), 404
+
+@media_bp.route('/users/<int:user_id>/<any(avatar, banner):kind>', methods=['GET'])
+def user_image(user_id, kind):
+    """A user's avatar or banner, e.g. /api/media/users/7/avatar?size=thumb"""
+    profile = Profile.query.filter_by(user_id=user_id).first()
+    if not profile:
+        return jsonify(success=False, message='Media not found.'), 404
+    return serve_variant(getattr(profile, f'{kind}_variants'), getattr(profile, kind))
+
+@media_bp.route('/posts/<int:post_id>', methods=['GET'])
+def post_image(post_id):
+    """A post's image, e.g. /api/media/posts/42?size=card&format=webp"""
+    post = db.session.get(Post, post_id)
+    if not post or not post.media_url:
+        return jsonify(success=False, message='Media not found.'), 404
+    if post.media_type != 'image':
+        return serve_media_url(post.media_url)
+    return serve_variant(post.media_variants, post.media_url)
@@ -1,16 +1,28 @@
 from flask import Blueprint, request, jsonify, current_app
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required, get_jwt_identity, verify_jwt_in_request
 from werkzeug.utils import secure_filename
-from models.post import Post
+from models.post import Post, PostTag
 from models.user import User
-from extensions import db
+from models.media import ImageJob, UploadSession
+from extensions import db, cache
+from services import likes
+from services import timeline
+from services import post_list
+from services.authors import author_summaries
+from services.image_jobs import enqueue_image, QueueFull
+from services.media_store import url_for_key, key_for_url, path_for_key
+from services.ingest import ingest, IMAGE_FORMATS, VIDEO_FORMATS
+from services.search import apply_search
+from services.tag_stats import TAG_WINDOWS, top_tags
+from services.view_counter import view_counter
+from services.http_cache import make_etag, conditional_json, PRIVATE_REVALIDATE, PUBLIC_REVALIDATE
 import os
 import uuid
 import json
+import base64
+import binascii
 from datetime import datetime
-from sqlalchemy import desc, asc, or_, and_
-from functools import wraps
-import time
+from sqlalchemy import desc, asc, or_, and_, func
 
 posts_bp = Blueprint('posts', __name__, url_prefix='/api')
 
@@ -19,26 +31,23 @@ ALLOWED_VIDEO_EXTENSIONS = {'mp4', 'mov', 'webm'}
 MAX_MEDIA_SIZE_MB = 10
 UPLOAD_FOLDER = 'static/uploads/posts/'
 
-# Simple in-memory cache for categories and tags
-_cache = {
-    'categories': None,
-    'popular_tags': None,
-    'last_updated': 0
+# Sort columns usable in cursor (keyset) mode; each is paired with Post.id as a tiebreaker
+KEYSET_SORT_COLUMNS = {
+    'created_at': Post.created_at,
+    'updated_at': Post.updated_at,
+    'likes_count': Post.likes_count,
+    'views_count': Post.views_count,
+    'comments_count': Post.comments_count,
+    'id': Post.id
 }
+KEYSET_DATETIME_COLUMNS = {'created_at', 'updated_at'}
 
-CACHE_DURATION = 300  # 5 minutes
+CATEGORIES_CACHE_TTL = 300  # seconds
+POPULAR_TAGS_CACHE_TTL = 60
 
-def cache_result(func):
-    """Decorator to cache function results"""
-    @wraps(func)
-    def wrapper(*args, **kwargs):
-        current_time = time.time()
-        if (current_time - _cache['last_updated']) > CACHE_DURATION:
-            _cache['categories'] = None
-            _cache['popular_tags'] = None
-            _cache['last_updated'] = current_time
-        return func(*args, **kwargs)
-    return wrapper
+# Any committed post or tag write retires the cached categories/leaderboards
+cache.watch(Post, lambda post, connection: ['posts'])
+cache.watch(PostTag, lambda link, connection: ['posts'])
 
 # Helper: allowed file
 def allowed_file(filename):
@@ -55,6 +64,7 @@ def get_media_type(filename):
 
 @posts_bp.route('/posts', methods=['POST'])
 @jwt_required()
+@ingest(MAX_MEDIA_SIZE_MB * 1024 * 1024, IMAGE_FORMATS + VIDEO_FORMATS)
 def create_post():
     if request.content_type and request.content_type.startswith('multipart/form-data'):
         # Handle multipart form data (file upload)
@@ -71,18 +81,12 @@ def create_post():
         if media_files:
             file = media_files[0]
             if file and allowed_file(file.filename):
-                ext = file.filename.rsplit('.', 1)[1].lower()
-                unique_id = str(uuid.uuid4())
-                filename = f'post_{get_jwt_identity()}_{unique_id}.{ext}'
-                upload_dir = os.path.join(current_app.root_path, 'static', 'uploads', 'posts')
-                os.makedirs(upload_dir, exist_ok=True)
-                filepath = os.path.join(upload_dir, filename)
-                # Save file in chunks to avoid memory spikes
-                with open(filepath, 'wb') as f:
-                    for chunk in file.stream:
-                        f.write(chunk)
-                media_url = f'/static/uploads/posts/{filename}'
-                media_type = get_media_type(filename)
+                # Sniffed, size checked and hashed while streaming in (@ingest);
+                # identical bytes are stored once
+                key = file.stream.store()
+                filepath = path_for_key(key)
+                media_url = url_for_key(key)
+                media_type = file.stream.kind
             else:
                 return jsonify({'success': False, 'message': 'Invalid file type.'}), 400
         user_id = get_jwt_identity()
@@ -96,8 +100,15 @@ def create_post():
         )
         new_post.set_tags(tags)
         db.session.add(new_post)
+        db.session.flush()
+        timeline.fan_out(new_post)
         db.session.commit()
-        return jsonify({'success': True, 'post': new_post.to_dict()}), 201
+        response = {'success': True, 'post': new_post.to_dict()}
+        if media_type == 'image':
+            job_id = queue_post_variants(new_post, filepath)
+            if job_id:
+                response['image_job_id'] = job_id
+        return jsonify(response), 201
     else:
         # Handle JSON
         data = request.get_json() or {}
@@ -110,6 +121,14 @@ def create_post():
         media_url = data.get('media_url')
         media_type = data.get('media_type')
         user_id = get_jwt_identity()
+        upload = None
+        if data.get('upload_id'):
+            # Media sent beforehand through /api/upload-sessions
+            upload = db.session.get(UploadSession, str(data['upload_id']))
+            if not upload or str(upload.user_id) != user_id or upload.status != 'complete':
+                return jsonify({'success': False, 'message': 'Upload not found or not complete.'}), 400
+            media_url = upload.media_url
+            media_type = get_media_type(media_url)
         new_post = Post(
             user_id=user_id,
             content=content,
@@ -120,47 +139,229 @@ def create_post():
         )
         new_post.set_tags(tags)
         db.session.add(new_post)
+        if upload:
+            # The post takes over the session's reference to the stored file
+            db.session.delete(upload)
+        db.session.flush()
+        timeline.fan_out(new_post)
         db.session.commit()
-        return jsonify({'success': True, 'post': new_post.to_dict()}), 201
+        response = {'success': True, 'post': new_post.to_dict()}
+        if upload and media_type == 'image':
+            job_id = queue_post_variants(new_post, path_for_key(key_for_url(media_url)))
+            if job_id:
+                response['image_job_id'] = job_id
+        return jsonify(response), 201
+
+def queue_post_variants(post, filepath):
+    """Queue thumb/card/full variants for an image post; the original stays as media_url"""
+    job_id = str(uuid.uuid4())
+    job = ImageJob(id=job_id, user_id=post.user_id, kind='post', post_id=post.id, status='queued')
+    db.session.add(job)
+    db.session.commit()
+    try:
+        enqueue_image(job, filepath, keep_source=True)
+    except QueueFull:
+        db.session.delete(job)
+        db.session.commit()
+        print(f'[POST] Image queue full, post {post.id} keeps only its original')
+        return None
+    except Exception as e:
+        # The post is already committed; it keeps its original image
+        db.session.rollback()
+        job.status, job.error = 'failed', 'The image could not be processed.'
+        db.session.commit()
+        print(f'[POST] Could not queue variants for post {post.id}: {e}')
+        return None
+    return job_id
+
+def apply_post_filters(query, category='', visibility='', tags='', tags_mode='all'):
+    """Apply the list filters shared by every posts listing mode.
+
+    ``tags`` is a comma separated list; ``tags_mode`` is ``all`` (every tag must
+    be present) or ``any`` (at least one). Both resolve through the post_tags
+    (tag, post_id) index.
+    """
+    if category:
+        query = query.filter(Post.category == category)
+
+    if visibility:
+        query = query.filter(Post.visibility == visibility)
+
+    if tags:
+        tag_list = list(dict.fromkeys(tag.strip() for tag in tags.split(',') if tag.strip()))
+        if tag_list:
+            matching = db.session.query(PostTag.post_id).filter(PostTag.tag.in_(tag_list))
+            if tags_mode != 'any' and len(tag_list) > 1:
+                matching = matching.group_by(PostTag.post_id).having(
+                    func.count(PostTag.tag) == len(tag_list)
+                )
+            query = query.filter(Post.id.in_(matching))
+
+    return query
+
+def encode_cursor(sort_by, sort_order, value, post_id):
+    """Build an opaque cursor from the last row's (sort value, id) pair"""
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    payload = json.dumps([sort_by, sort_order, value, post_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor, sort_by, sort_order):
+    """Parse a cursor produced by encode_cursor; raises ValueError if it is malformed"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        cursor_sort_by, cursor_sort_order, value, post_id = json.loads(base64.urlsafe_b64decode(padded))
+        post_id = int(post_id)
+        if value is not None and sort_by in KEYSET_DATETIME_COLUMNS:
+            value = datetime.fromisoformat(value)
+    except (TypeError, ValueError, binascii.Error) as e:
+        raise ValueError(f'Malformed cursor: {e}')
+    if (cursor_sort_by, cursor_sort_order) != (sort_by, sort_order):
+        raise ValueError('Cursor does not match sort_by/sort_order')
+    return value, post_id
+
+def apply_keyset(query, sort_by, sort_order, cursor=None):
+    """Order by (sort column, id) and seek past the cursor row.
+
+    NULL sort values are treated as larger than any value (the Postgres
+    btree default) so both directions can be served by one (column, id) index.
+    """
+    column = KEYSET_SORT_COLUMNS[sort_by]
+    ascending = sort_order == 'asc'
+
+    if sort_by == 'id':
+        query = query.order_by(asc(Post.id) if ascending else desc(Post.id))
+        if cursor:
+            _, last_id = decode_cursor(cursor, sort_by, sort_order)
+            query = query.filter(Post.id > last_id if ascending else Post.id < last_id)
+        return query
+
+    if ascending:
+        query = query.order_by(asc(column).nulls_last(), asc(Post.id))
+    else:
+        query = query.order_by(desc(column).nulls_first(), desc(Post.id))
+
+    if cursor:
+        value, last_id = decode_cursor(cursor, sort_by, sort_order)
+        if ascending:
+            if value is None:
+                seek = and_(column.is_(None), Post.id > last_id)
+            else:
+                seek = or_(column > value, and_(column == value, Post.id > last_id), column.is_(None))
+        else:
+            if value is None:
+                seek = or_(and_(column.is_(None), Post.id < last_id), column.isnot(None))
+            else:
+                seek = or_(column < value, and_(column == value, Post.id < last_id))
+        query = query.filter(seek)
+    return query
+
+def iter_serialized_posts(posts, authors, liked=None):
+    """Yield list-view post dicts with their ``author`` summary.
+
+    ``liked`` (a set of ids) adds per-post liked flags.
+    """
+    for post in posts:
+        post['author'] = authors.get(post['user_id'])
+        if liked is not None:
+            post['liked'] = post['id'] in liked
+        yield post
+
+def posts_response(posts, pagination):
+    """Build a conditional JSON response for a page of list-view post dicts.
+
+    The ETag covers everything the page renders (ids, like and comment
+    counts, tags, updated_at, author summaries, the viewer's likes and the
+    pagination block), so a 304 is returned without encoding a single post.
+    View counts are left out: they change on every flush of the view buffer
+    and would turn each poll into a full response.
+    """
+    post_ids = [post['id'] for post in posts]
+    viewer_id = current_viewer_id()
+    liked = likes.liked_post_ids(viewer_id, post_ids) if viewer_id else None
+    authors = author_summaries({post['user_id'] for post in posts})
+
+    etag = make_etag(
+        'posts', viewer_id, sorted(liked) if liked is not None else None, pagination,
+        [(post['id'], post['updated_at'], post['likes_count'], post['comments_count'], post['tags']) for post in posts],
+        sorted(authors.items())
+    )
+    return conditional_json(
+        etag,
+        lambda: {'success': True, 'pagination': pagination, 'posts': iter_serialized_posts(posts, authors, liked)},
+        cache_control=PRIVATE_REVALIDATE if viewer_id else PUBLIC_REVALIDATE,
+        vary='Authorization',
+        stream_key='posts'
+    )
 
 @posts_bp.route('/posts', methods=['GET'])
 def get_posts():
+    """List posts.
+
+    Two pagination modes are supported:
+    - page mode (default): ``page``/``per_page``, returns totals via COUNT(*)
+    - cursor mode: pass ``cursor`` (empty for the first page) and follow
+      ``pagination.next_cursor``; no OFFSET scan and no COUNT(*)
+
+    ``search`` goes through the full-text index and, unless ``sort_by`` is
+    given, orders page mode results by relevance (``sort_by=relevance``).
+
+    Posts are list-view projections: ``content`` is cut to ``preview_length``
+    characters (default 280) and ``content_truncated`` says whether the full
+    body must be fetched from GET /api/posts/<id>.
+    """
     try:
         # Get query parameters
         page = request.args.get('page', 1, type=int)
         per_page = min(request.args.get('per_page', 10, type=int), 50)  # Max 50 per page
+        cursor = request.args.get('cursor')
         search = request.args.get('search', '').strip()
         category = request.args.get('category', '').strip()
         visibility = request.args.get('visibility', '').strip()
         tags = request.args.get('tags', '').strip()
-        sort_by = request.args.get('sort_by', 'created_at')
+        tags_mode = request.args.get('tags_mode', 'all')
+        sort_by = request.args.get('sort_by', 'relevance' if search else 'created_at')
         sort_order = request.args.get('sort_order', 'desc')
+        preview_length = max(0, min(request.args.get('preview_length', post_list.PREVIEW_LENGTH, type=int), 2000))
 
         # Build query
-        query = Post.query
-
-        # Apply filters
+        query = apply_post_filters(post_list.list_query(preview_length), category, visibility, tags, tags_mode)
+        relevance = None
         if search:
-            search_filter = or_(
-                Post.content.ilike(f'%{search}%'),
-                Post.category.ilike(f'%{search}%')
-            )
-            query = query.filter(search_filter)
+            query, relevance = apply_search(query, search)
 
-        if category:
-            query = query.filter(Post.category == category)
+        if cursor is not None:
+            if sort_by not in KEYSET_SORT_COLUMNS:
+                sort_by = 'created_at'
+            sort_order = 'asc' if sort_order == 'asc' else 'desc'
+            try:
+                query = apply_keyset(query, sort_by, sort_order, cursor.strip())
+            except ValueError as e:
+                print(f'[GET /api/posts] Bad cursor: {e}')
+                return jsonify(success=False, message='Invalid cursor.'), 400
 
-        if visibility:
-            query = query.filter(Post.visibility == visibility)
+            # Fetch one extra row to know whether another page exists
+            rows = query.limit(per_page + 1).all()
+            has_next = len(rows) > per_page
+            posts = post_list.rows_to_dicts(rows[:per_page], preview_length)
+            next_cursor = None
+            if has_next:
+                last = posts[-1]
+                next_cursor = encode_cursor(sort_by, sort_order, last[sort_by], last['id'])
 
-        if tags:
-            tag_list = [tag.strip() for tag in tags.split(',') if tag.strip()]
-            for tag in tag_list:
-                query = query.filter(Post.tags.contains(f'"{tag}"'))
+            return posts_response(posts, {
+                'per_page': per_page,
+                'sort_by': sort_by,
+                'sort_order': sort_order,
+                'next_cursor': next_cursor,
+                'has_next': has_next
+            })
 
         # Apply sorting
         sort_column = getattr(Post, sort_by, Post.created_at)
-        if sort_order == 'asc':
+        if sort_by == 'relevance' and relevance is not None:
+            query = query.order_by(relevance, desc(Post.id))
+        elif sort_order == 'asc':
             query = query.order_by(asc(sort_column))
         else:
             query = query.order_by(desc(sort_column))
@@ -172,96 +373,168 @@ def get_posts():
             error_out=False
         )
 
-        posts_data = [post.to_dict() for post in pagination.items]
-
-        return jsonify({
-            'success': True,
-            'posts': posts_data,
-            'pagination': {
-                'page': page,
-                'per_page': per_page,
-                'total': pagination.total,
-                'pages': pagination.pages,
-                'has_next': pagination.has_next,
-                'has_prev': pagination.has_prev
-            }
-        }), 200
+        return posts_response(post_list.rows_to_dicts(pagination.items, preview_length), {
+            'page': page,
+            'per_page': per_page,
+            'total': pagination.total,
+            'pages': pagination.pages,
+            'has_next': pagination.has_next,
+            'has_prev': pagination.has_prev
+        })
 
     except Exception as e:
         print(f'[GET /api/posts] Error: {e}')
         return jsonify(success=False, message='Failed to fetch posts.'), 500
 
+@posts_bp.route('/posts/<int:post_id>', methods=['GET'])
+def get_post(post_id):
+    """Get a single post with its full content"""
+    try:
+        post = db.session.get(Post, post_id)
+        if not post:
+            return jsonify(success=False, message='Post not found.'), 404
+
+        viewer_id = current_viewer_id()
+        liked = bool(likes.liked_post_ids(viewer_id, [post.id])) if viewer_id else None
+        author = author_summaries([post.user_id]).get(post.user_id)
+
+        etag = make_etag(
+            'post', post.id, viewer_id, liked, post.updated_at,
+            post.likes_count, post.comments_count, post.get_tags(), author
+        )
+
+        def build_body():
+            # Only a full read counts as a view; revalidations (304) do not
+            view_counter.record([post.id])
+            data = post.to_dict()
+            data['author'] = author
+            if liked is not None:
+                data['liked'] = liked
+            return {'success': True, 'post': data}
+
+        return conditional_json(
+            etag,
+            build_body,
+            cache_control=PRIVATE_REVALIDATE if viewer_id else PUBLIC_REVALIDATE,
+            vary='Authorization'
+        )
+    except Exception as e:
+        print(f'[GET /api/posts/{post_id}] Error: {e}')
+        return jsonify(success=False, message='Failed to fetch post.'), 500
+
+def load_categories():
+    categories = db.session.query(Post.category).filter(
+        Post.category.isnot(None),
+        Post.category != ''
+    ).distinct().all()
+    return [cat[0] for cat in categories if cat[0]]
+
 @posts_bp.route('/posts/categories', methods=['GET'])
-@cache_result
 def get_categories():
     """Get all available categories"""
     try:
-        if _cache['categories'] is not None:
-            return jsonify(success=True, categories=_cache['categories'])
-
-        categories = db.session.query(Post.category).filter(
-            Post.category.isnot(None),
-            Post.category != ''
-        ).distinct().all()
-        
-        category_list = [cat[0] for cat in categories if cat[0]]
-        _cache['categories'] = category_list
-        
-        return jsonify(success=True, categories=category_list), 200
+        category_list = cache.get_or_set(
+            'posts:categories', load_categories, ttl=CATEGORIES_CACHE_TTL, tags=('posts',)
+        )
+        return conditional_json(
+            make_etag('categories', category_list),
+            lambda: {'success': True, 'categories': category_list}
+        )
     except Exception as e:
         print(f'[GET /api/posts/categories] Error: {e}')
         return jsonify(success=False, message='Failed to fetch categories.'), 500
 
 @posts_bp.route('/posts/popular-tags', methods=['GET'])
-@cache_result
 def get_popular_tags():
-    """Get most popular tags"""
+    """Get most popular tags.
+
+    ``window`` is ``24h``, ``7d`` or ``all`` (default); ``limit`` caps the
+    leaderboard at 100 entries. Counts come from the incrementally maintained
+    tag counters, so cost scales with the tags returned, not with posts stored.
+    """
     try:
-        if _cache['popular_tags'] is not None:
-            return jsonify(success=True, tags=_cache['popular_tags'])
-
-        # Get all posts with tags
-        posts_with_tags = Post.query.filter(
-            Post.tags.isnot(None),
-            Post.tags != ''
-        ).all()
-
-        tag_count = {}
-        for post in posts_with_tags:
-            tags = post.get_tags()
-            for tag in tags:
-                tag_count[tag] = tag_count.get(tag, 0) + 1
-
-        # Sort by count and get top 20
-        popular_tags = sorted(tag_count.items(), key=lambda x: x[1], reverse=True)[:20]
-        tag_list = [tag for tag, count in popular_tags]
-        
-        _cache['popular_tags'] = tag_list
-        
-        return jsonify(success=True, tags=tag_list), 200
+        window = request.args.get('window', 'all')
+        if window != 'all' and window not in TAG_WINDOWS:
+            return jsonify(success=False, message='Invalid window. Use 24h, 7d or all.'), 400
+        limit = max(1, min(request.args.get('limit', 20, type=int), 100))
+
+        leaderboard = cache.get_or_set(
+            f'posts:popular-tags:{window}:{limit}',
+            # Lists, not tuples: shared backends hand cached values back as JSON
+            lambda: [[tag, count] for tag, count in top_tags(limit, None if window == 'all' else window)],
+            ttl=POPULAR_TAGS_CACHE_TTL,
+            tags=('posts',)
+        )
+
+        return conditional_json(
+            make_etag('popular-tags', window, leaderboard),
+            lambda: {
+                'success': True,
+                'window': window,
+                'tags': [tag for tag, count in leaderboard],
+                'counts': [{'tag': tag, 'count': count} for tag, count in leaderboard]
+            }
+        )
     except Exception as e:
         print(f'[GET /api/posts/popular-tags] Error: {e}')
         return jsonify(success=False, message='Failed to fetch popular tags.'), 500
 
+def current_viewer_id():
+    """Return the JWT user id when a valid token was sent, otherwise None"""
+    try:
+        verify_jwt_in_request(optional=True)
+        identity = get_jwt_identity()
+        return int(identity) if identity is not None else None
+    except Exception:
+        return None
+
 @posts_bp.route('/posts/<int:post_id>/like', methods=['POST'])
 @jwt_required()
 def like_post(post_id):
+    """Like a post; repeating the call is a no-op"""
     try:
-        user_id = get_jwt_identity()
-        post = Post.query.get(post_id)
-        
-        if not post:
+        user_id = int(get_jwt_identity())
+        if not db.session.query(Post.id).filter(Post.id == post_id).first():
             return jsonify(success=False, message='Post not found.'), 404
 
-        # For now, just increment likes count
-        # In a real app, you'd want a separate likes table
-        post.likes_count += 1
+        likes.like(user_id, post_id)
         db.session.commit()
 
-        return jsonify(success=True, likes_count=post.likes_count), 200
+        return jsonify(success=True, liked=True, likes_count=likes.likes_count(post_id)), 200
     except Exception as e:
+        db.session.rollback()
         print(f'[POST /api/posts/{post_id}/like] Error: {e}')
-        return jsonify(success=False, message='Failed to like post.'), 500 
+        return jsonify(success=False, message='Failed to like post.'), 500
+
+@posts_bp.route('/posts/<int:post_id>/like', methods=['DELETE'])
+@jwt_required()
+def unlike_post(post_id):
+    """Remove the current user's like; repeating the call is a no-op"""
+    try:
+        user_id = int(get_jwt_identity())
+        if not db.session.query(Post.id).filter(Post.id == post_id).first():
+            return jsonify(success=False, message='Post not found.'), 404
+
+        likes.unlike(user_id, post_id)
+        db.session.commit()
+
+        return jsonify(success=True, liked=False, likes_count=likes.likes_count(post_id)), 200
+    except Exception as e:
+        db.session.rollback()
+        print(f'[DELETE /api/posts/{post_id}/like] Error: {e}')
+        return jsonify(success=False, message='Failed to unlike post.'), 500
+
+@posts_bp.route('/posts/likes', methods=['GET'])
+@jwt_required()
+def get_liked_posts():
+    """Return which of ``ids`` (comma separated, max 100) the current user has liked"""
+    try:
+        ids = [int(i) for i in request.args.get('ids', '').split(',') if i.strip().isdigit()][:100]
+        liked = likes.liked_post_ids(int(get_jwt_identity()), ids)
+        return jsonify(success=True, liked=[post_id for post_id in ids if post_id in liked]), 200
+    except Exception as e:
+        print(f'[GET /api/posts/likes] Error: {e}')
+        return jsonify(success=False, message='Failed to fetch likes.'), 500
 
 @posts_bp.route('/posts', methods=['OPTIONS'])
 def posts_options():
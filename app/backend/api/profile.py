@@ -1,37 +1,63 @@
-from flask import Blueprint, request, jsonify, send_file, current_app, make_response, send_from_directory
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask import Blueprint, request, jsonify, send_file, current_app, make_response
+from flask_jwt_extended import jwt_required, get_jwt_identity, current_user
 from werkzeug.utils import secure_filename
-from PIL import Image
 import os
-import io
 import uuid
 from datetime import datetime
 from models.user import User
 from models.profile import Profile, Experience, Education
 from flask_cors import CORS
-from extensions import db
+from extensions import db, cache
+from services.http_cache import make_etag, is_fresh, conditional_json, PRIVATE_REVALIDATE
+from services.authors import author_summaries
+from services.image_jobs import enqueue_profile_image, QueueFull
+from services.media_files import send_media
+from services.ingest import ingest, IMAGE_FORMATS
+from models.media import ImageJob
+from sqlalchemy import select
 
 profile_bp = Blueprint('profile', __name__, url_prefix='/api')
 # REMOVE per-blueprint CORS (handled globally in main.py)
 # CORS(profile_bp, origins=["http://localhost:5173", "http://localhost:5174"], supports_credentials=True)
 
-ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg'}
 MAX_IMAGE_SIZE_MB = 5
-AVATAR_SIZE = (256, 256)
+IMAGE_RETRY_AFTER = 5  # seconds
+PROFILE_CACHE_TTL = 120  # seconds
+MAX_BULK_PROFILES = 200
 
-# Helper: allowed file
-def allowed_file(filename):
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+def _profile_owner_tags(child, connection):
+    user_id = connection.execute(
+        select(Profile.user_id).where(Profile.id == child.profile_id)
+    ).scalar()
+    return [f'user:{user_id}'] if user_id is not None else []
 
-# Helper: compress and resize image
-def compress_image(file_stream):
-    img = Image.open(file_stream)
-    img = img.convert('RGB')
-    img.thumbnail(AVATAR_SIZE)
-    output = io.BytesIO()
-    img.save(output, format='JPEG', quality=85)
-    output.seek(0)
-    return output
+# Committed writes to a user or any part of their profile retire the cached payload
+cache.watch(User, lambda user, connection: [f'user:{user.id}'])
+cache.watch(Profile, lambda profile, connection: [f'user:{profile.user_id}'])
+cache.watch(Experience, _profile_owner_tags)
+cache.watch(Education, _profile_owner_tags)
+
+# Helper: queue an uploaded avatar/banner for background processing
+def queue_image_job(user, kind, file):
+    job = ImageJob(id=str(uuid.uuid4()), user_id=user.id, kind=kind, status='queued')
+    db.session.add(job)
+    db.session.commit()
+    try:
+        enqueue_profile_image(job, file)
+    except QueueFull:
+        db.session.delete(job)
+        db.session.commit()
+        print(f'[UPLOAD] Image queue full, rejecting {kind} for user {user.id}')
+        response = jsonify(success=False, message='Image processing is busy. Please retry shortly.')
+        response.headers['Retry-After'] = str(IMAGE_RETRY_AFTER)
+        return response, 503
+    print(f'[UPLOAD] {kind} queued as job {job.id}')
+    # Stored names are content hashes, so ``url`` is the stable media route
+    # that serves the new image once the job is done
+    return jsonify(
+        success=True, job_id=job.id, status=job.status, url=f'/api/media/users/{user.id}/{kind}',
+        status_url=f'/api/profile/image-jobs/{job.id}'
+    ), 202
 
 @profile_bp.before_request
 def log_request():
@@ -41,10 +67,104 @@ def log_request():
 @jwt_required()
 def get_profile():
     user_id = get_jwt_identity()
-    user = User.query.get(user_id)
-    if not user:
+    tags = (f'user:{user_id}',)
+    validator_key = f'profile-validator:{user_id}'
+
+    # The validator is one small cached entry, so a matching If-None-Match
+    # answers 304 without loading experiences/education or serializing.
+    # It holds the profile version and the User fields in the payload,
+    # which change without touching the profile.
+    validator = cache.get(validator_key, tags)
+    if validator is not None:
+        etag = make_etag('profile', user_id, validator)
+        if is_fresh(etag):
+            return conditional_json(etag, None, cache_control=PRIVATE_REVALIDATE)
+
+    def load():
+        user = User.with_profile().filter(User.id == user_id).first()
+        if not user:
+            return None
+        # The JOIN already read every validator field; caching it spares a query
+        version = user.profile.version if user.profile else 0
+        cache.set(validator_key, [version, user.username, user.email], PROFILE_CACHE_TTL, tags)
+        return user.serialize()
+    payload = cache.get_or_set(f'profile:{user_id}', load, ttl=PROFILE_CACHE_TTL, tags=tags)
+    if payload is None:
         return jsonify({'error': 'User not found.'}), 404
-    return jsonify({'success': True, 'user': user.serialize()})
+    if validator is None:
+        def load_validator():
+            row = db.session.query(Profile.version, User.username, User.email).outerjoin(
+                Profile, Profile.user_id == User.id
+            ).filter(User.id == user_id).first()
+            return [row[0] or 0, row[1], row[2]] if row else None
+        validator = cache.get_or_set(validator_key, load_validator, ttl=PROFILE_CACHE_TTL, tags=tags)
+        if validator is None:
+            return jsonify({'error': 'User not found.'}), 404
+    etag = make_etag('profile', user_id, validator)
+    return conditional_json(etag, lambda: {'success': True, 'user': payload}, cache_control=PRIVATE_REVALIDATE)
+
+def _load_profile_payloads(keys):
+    user_ids = [int(key.split(':', 1)[1]) for key in keys]
+    users = User.with_profile().filter(User.id.in_(user_ids)).all()
+    return {f'profile:{user.id}': user.serialize() for user in users}
+
+def profile_payloads(user_ids):
+    """Map user id -> full profile payload, sharing GET /api/profile's cache entries"""
+    found = cache.get_or_set_many(
+        [f'profile:{user_id}' for user_id in user_ids],
+        _load_profile_payloads,
+        ttl=PROFILE_CACHE_TTL,
+        tags_for=lambda key: (f"user:{key.split(':', 1)[1]}",)
+    )
+    return {payload['id']: payload for payload in found.values() if payload is not None}
+
+@profile_bp.route('/profiles', methods=['GET', 'POST'])
+@jwt_required()
+def get_profiles():
+    """Bulk profile lookup.
+
+    GET takes ``ids=1,2,3``; POST takes ``{"ids": [...]}`` for long lists. At
+    most MAX_BULK_PROFILES ids per call. ``view`` is ``compact`` (default:
+    username, name, title, avatar) or ``full`` (the GET /api/profile payload,
+    without other users' email addresses). Cached ids never hit the database;
+    the misses are loaded in one batched query.
+    """
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        raw_ids = data.get('ids')
+        view = data.get('view', 'compact')
+    else:
+        raw_ids = [part for part in request.args.get('ids', '').split(',') if part.strip()]
+        view = request.args.get('view', 'compact')
+
+    if not isinstance(raw_ids, list) or not raw_ids:
+        return jsonify(success=False, message='ids must be a non-empty list of user ids.'), 400
+    try:
+        user_ids = list(dict.fromkeys(int(user_id) for user_id in raw_ids))
+    except (TypeError, ValueError):
+        return jsonify(success=False, message='ids must be integers.'), 400
+    if len(user_ids) > MAX_BULK_PROFILES:
+        return jsonify(success=False, message=f'At most {MAX_BULK_PROFILES} ids per request.'), 400
+    if view not in ('compact', 'full'):
+        return jsonify(success=False, message='view must be compact or full.'), 400
+
+    try:
+        if view == 'full':
+            viewer_id = int(get_jwt_identity())
+            found = profile_payloads(user_ids)
+            for user_id, payload in found.items():
+                if user_id != viewer_id:
+                    found[user_id] = {key: value for key, value in payload.items() if key != 'email'}
+        else:
+            found = author_summaries(user_ids)
+        return jsonify(
+            success=True,
+            profiles=[found[user_id] for user_id in user_ids if user_id in found],
+            missing=[user_id for user_id in user_ids if user_id not in found]
+        )
+    except Exception as e:
+        print(f'[GET /api/profiles] Error: {e}')
+        return jsonify(success=False, message='Failed to fetch profiles.'), 500
 
 @profile_bp.route('/profile', methods=['PUT'])
 @jwt_required()
@@ -57,7 +177,7 @@ def update_profile():
         if not user_id:
             print('[PROFILE API] JWT missing or invalid')
             return jsonify(success=False, message='JWT missing or invalid'), 401
-        user = User.query.get(user_id)
+        user = User.with_profile().filter(User.id == user_id).first()
         if not user:
             return jsonify(success=False, message='User not found'), 404
         data = request.get_json() or {}
@@ -65,10 +185,10 @@ def update_profile():
         print('Request headers:', dict(request.headers))
         print('Request method:', request.method)
         print('Request content type:', request.content_type)
-        profile = Profile.query.filter_by(user_id=user.id).first()
+        profile = user.profile
         if not profile:
             profile = Profile(user_id=user.id)
-            db.session.add(profile)
+            user.profile = profile
         # Validate types for skills and socials
         if 'skills' in data and not isinstance(data['skills'], list):
             return jsonify(success=False, message='Skills must be a list.'), 400
@@ -88,84 +208,42 @@ def update_profile():
         profile.socials = data.get('socials') if isinstance(data.get('socials'), dict) and data.get('socials') else (profile.socials or {})
         # Experiences and education (optional, fallback to existing)
         if 'experiences' in data and isinstance(data['experiences'], list):
-            # Clear existing experiences
-            for exp in profile.experiences:
-                db.session.delete(exp)
-            
-            # Add new experiences
+            # Replace existing experiences (delete-orphan removes the old rows)
+            experiences = []
             for exp_data in data['experiences']:
                 if exp_data.get('title'):  # Only add if title exists
-                    exp = Experience(
-                        profile_id=profile.id,
+                    experiences.append(Experience(
                         title=exp_data.get('title', ''),
                         company=exp_data.get('company', ''),
                         description=exp_data.get('description', ''),
-                        start_date=datetime.fromisoformat(exp_data['start_date']) if exp_data.get('start_date') else None,
-                        end_date=datetime.fromisoformat(exp_data['end_date']) if exp_data.get('end_date') else None
-                    )
-                    db.session.add(exp)
+                        start_date=datetime.fromisoformat(exp_data['start_date']).date() if exp_data.get('start_date') else None,
+                        end_date=datetime.fromisoformat(exp_data['end_date']).date() if exp_data.get('end_date') else None
+                    ))
+            profile.experiences = experiences
         
         # Handle education
         if 'education' in data and isinstance(data['education'], list):
-            # Clear existing education
-            for edu in profile.education:
-                db.session.delete(edu)
-            
-            # Add new education
+            # Replace existing education (delete-orphan removes the old rows)
+            education = []
             for edu_data in data['education']:
                 if edu_data.get('school'):  # Only add if school exists
-                    edu = Education(
-                        profile_id=profile.id,
+                    education.append(Education(
                         school=edu_data.get('school', ''),
                         degree=edu_data.get('degree', ''),
                         field=edu_data.get('field', ''),
-                        start_date=datetime.fromisoformat(edu_data['start_date']) if edu_data.get('start_date') else None,
-                        end_date=datetime.fromisoformat(edu_data['end_date']) if edu_data.get('end_date') else None
-                    )
-                    db.session.add(edu)
+                        start_date=datetime.fromisoformat(edu_data['start_date']).date() if edu_data.get('start_date') else None,
+                        end_date=datetime.fromisoformat(edu_data['end_date']).date() if edu_data.get('end_date') else None
+                    ))
+            profile.education = education
         
+        profile.touch()
+        # Serialize from the flushed in-memory state; after commit every
+        # attribute would be expired and reloaded lazily
+        db.session.flush()
+        payload = profile.serialize()
         db.session.commit()
-        
-        # Return updated profile
-        avatar_url = None
-        if profile.avatar:
-            if profile.avatar.startswith('http'):
-                avatar_url = profile.avatar
-            else:
-                avatar_url = f"/api/uploads/{os.path.basename(profile.avatar)}"
-        
-        return jsonify(success=True, profile={
-            'id': profile.id,
-            'user_id': profile.user_id,
-            'avatar': avatar_url,
-            'name': profile.name or '',
-            'title': profile.title or '',
-            'bio': profile.bio or '',
-            'location': profile.location or '',
-            'address': profile.address or '',
-            'skills': profile.skills or [],
-            'socials': profile.socials or {},
-            'experiences': [
-                {
-                    'id': exp.id,
-                    'title': exp.title,
-                    'company': exp.company,
-                    'start_date': exp.start_date.isoformat() if exp.start_date else None,
-                    'end_date': exp.end_date.isoformat() if exp.end_date else None,
-                    'description': exp.description
-                } for exp in profile.experiences
-            ],
-            'education': [
-                {
-                    'id': edu.id,
-                    'school': edu.school,
-                    'degree': edu.degree,
-                    'field': edu.field,
-                    'start_date': edu.start_date.isoformat() if edu.start_date else None,
-                    'end_date': edu.end_date.isoformat() if edu.end_date else None
-                } for edu in profile.education
-            ]
-        })
+
+        return jsonify(success=True, profile=payload)
     except Exception as e:
         print(f"Error updating profile: {e}")
         db.session.rollback()
@@ -173,17 +251,13 @@ def update_profile():
 
 @profile_bp.route('/profile/image', methods=['POST'])
 @jwt_required()
+@ingest(MAX_IMAGE_SIZE_MB * 1024 * 1024, IMAGE_FORMATS)
 def upload_avatar():
     try:
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
-        if not user:
-            print('[UPLOAD] User not found')
-            return jsonify(success=False, message='User not found'), 404
-        profile = Profile.query.filter_by(user_id=user.id).first()
-        if not profile:
-            profile = Profile(user_id=user.id)
-            db.session.add(profile)
+        # Cached identity (services/identity.py); the token's user is known to exist
+        user = current_user
+        if user.profile_id is None:
+            db.session.add(Profile(user_id=user.id))
             db.session.commit()
         # Accept both 'file' and 'banner' as possible keys
         print('[UPLOAD DEBUG] request.files:', request.files)
@@ -199,45 +273,20 @@ def upload_avatar():
         if file.filename == '':
             print('[UPLOAD] No selected file')
             return jsonify(success=False, message='No selected file'), 400
-        if not allowed_file(file.filename):
-            print('[UPLOAD] Invalid file type:', file.filename)
-            return jsonify(success=False, message='Invalid file type. Only jpg/png allowed.'), 400
-        file.seek(0, os.SEEK_END)
-        file_length = file.tell()
-        file.seek(0)
-        if file_length > MAX_IMAGE_SIZE_MB * 1024 * 1024:
-            print('[UPLOAD] File too large:', file_length)
-            return jsonify(success=False, message='File too large. Max 5MB.'), 400
-        compressed = compress_image(file)
-        unique_id = str(uuid.uuid4())
-        filename = f"avatar_{user.id}_{unique_id}.jpg"
-        upload_dir = os.path.join(current_app.root_path, 'static', 'uploads')
-        os.makedirs(upload_dir, exist_ok=True)
-        filepath = os.path.join(upload_dir, filename)
-        with open(filepath, 'wb') as f:
-            f.write(compressed.read())
-        profile.avatar = f'/static/uploads/{filename}'
-        db.session.commit()
-        avatar_url = f"/api/uploads/{filename}"
-        print('[UPLOAD] Avatar uploaded:', avatar_url)
-        return jsonify(success=True, url=avatar_url)
+        # Type, dimensions and size were checked while the body streamed in (@ingest)
+        return queue_image_job(user, 'avatar', file)
     except Exception as e:
         print(f"[UPLOAD] Error uploading avatar: {e}")
         return jsonify(success=False, message='Image upload failed. Please try again.'), 500
 
 @profile_bp.route('/profile/banner', methods=['POST'])
 @jwt_required()
+@ingest(MAX_IMAGE_SIZE_MB * 1024 * 1024, IMAGE_FORMATS)
 def upload_banner():
     try:
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
-        if not user:
-            print('[UPLOAD] User not found')
-            return jsonify(success=False, message='User not found'), 404
-        profile = Profile.query.filter_by(user_id=user.id).first()
-        if not profile:
-            profile = Profile(user_id=user.id)
-            db.session.add(profile)
+        user = current_user
+        if user.profile_id is None:
+            db.session.add(Profile(user_id=user.id))
             db.session.commit()
         file = request.files.get('file')
         if not file:
@@ -246,31 +295,21 @@ def upload_banner():
         if file.filename == '':
             print('[UPLOAD] No selected file')
             return jsonify(success=False, message='No selected file'), 400
-        if not allowed_file(file.filename):
-            print('[UPLOAD] Invalid file type:', file.filename)
-            return jsonify(success=False, message='Invalid file type. Only jpg/png allowed.'), 400
-        file.seek(0, os.SEEK_END)
-        file_length = file.tell()
-        file.seek(0)
-        if file_length > MAX_IMAGE_SIZE_MB * 1024 * 1024:
-            print('[UPLOAD] File too large:', file_length)
-            return jsonify(success=False, message='File too large. Max 5MB.'), 400
-        # Save banner as-is (no compression)
-        unique_id = str(uuid.uuid4())
-        filename = f"banner_{user.id}_{unique_id}.jpg"
-        upload_dir = os.path.join(current_app.root_path, 'static', 'uploads')
-        os.makedirs(upload_dir, exist_ok=True)
-        filepath = os.path.join(upload_dir, filename)
-        file.save(filepath)
-        profile.banner = f'/static/uploads/{filename}'
-        db.session.commit()
-        banner_url = f"/api/uploads/{filename}"
-        print('[UPLOAD] Banner uploaded:', banner_url)
-        return jsonify(success=True, url=banner_url)
+        # Type, dimensions and size were checked while the body streamed in (@ingest)
+        return queue_image_job(user, 'banner', file)
     except Exception as e:
         print(f"[UPLOAD] Error uploading banner: {e}")
         return jsonify(success=False, message='Banner upload failed. Please try again.'), 500
 
+@profile_bp.route('/profile/image-jobs/<job_id>', methods=['GET'])
+@jwt_required()
+def get_image_job(job_id):
+    """Poll an avatar/banner upload; ``status`` is queued, done or failed"""
+    job = db.session.get(ImageJob, job_id)
+    if not job or job.user_id != int(get_jwt_identity()):
+        return jsonify(success=False, message='Job not found.'), 404
+    return jsonify(success=True, job=job.to_dict())
+
 @profile_bp.route('/profile/resume', methods=['GET'])
 def download_resume():
     resume_path = os.path.join(current_app.root_path, 'static', 'resume', 'resume.pdf')
@@ -282,11 +321,10 @@ def download_resume():
         c.save()
     return send_file(resume_path, as_attachment=True)
 
-# Serve uploaded images
-@profile_bp.route('/uploads/<filename>', methods=['GET'])
+# Serve uploaded files (Range, immutable caching and proxy offload, see services/media_files.py)
+@profile_bp.route('/uploads/<path:filename>', methods=['GET'])
 def uploaded_file(filename):
-    upload_dir = os.path.join(current_app.root_path, 'static', 'uploads')
-    return send_from_directory(upload_dir, filename)
+    return send_media(filename)
 
 @profile_bp.route('/profile', methods=['OPTIONS'])
 def profile_options():
@@ -0,0 +1,111 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from werkzeug.utils import secure_filename
+from models.media import UploadSession
+from extensions import db
+from services import upload_sessions
+from services.upload_sessions import UploadError, MAX_CHUNK_SIZE
+from services.ingest import ingest
+from api.posts import allowed_file, MAX_MEDIA_SIZE_MB
+
+uploads_bp = Blueprint('uploads', __name__, url_prefix='/api')
+
+def owned_session(session_id):
+    session = db.session.get(UploadSession, session_id)
+    if not session or str(session.user_id) != get_jwt_identity():
+        return None
+    return session
+
+def session_response(session, status=200):
+    response = jsonify({'success': True, 'upload': session.to_dict()})
+    response.headers['Upload-Offset'] = str(session.offset)
+    response.headers['Upload-Length'] = str(session.size)
+    response.headers['Cache-Control'] = 'no-store'
+    return response, status
+
+def error_response(error, session=None):
+    response = jsonify({'success': False, 'message': error.message})
+    if session is not None:
+        response.headers['Upload-Offset'] = str(session.offset)
+    return response, error.status
+
+@uploads_bp.route('/upload-sessions', methods=['POST'])
+@jwt_required()
+def create_upload_session():
+    """Open a resumable upload: {filename, size, checksum?} -> 201 with the session id"""
+    data = request.get_json() or {}
+    filename = secure_filename(data.get('filename') or '')
+    if not filename or not allowed_file(filename):
+        return jsonify({'success': False, 'message': 'Invalid file type.'}), 400
+    try:
+        size = int(data.get('size'))
+    except (TypeError, ValueError):
+        size = 0
+    if size <= 0:
+        return jsonify({'success': False, 'message': 'size must be a positive integer.'}), 400
+    upload_sessions.purge_expired()
+    try:
+        session = upload_sessions.create_session(
+            int(get_jwt_identity()), filename, size,
+            checksum=data.get('checksum'), max_size=MAX_MEDIA_SIZE_MB * 1024 * 1024
+        )
+    except UploadError as e:
+        return error_response(e)
+    db.session.commit()
+    print(f'[UPLOADS] Session {session.id} opened for {size} bytes')
+    return session_response(session, 201)
+
+@uploads_bp.route('/upload-sessions/<session_id>', methods=['GET', 'HEAD'])
+@jwt_required()
+def get_upload_session(session_id):
+    """Current offset, so an interrupted client knows where to resume"""
+    session = owned_session(session_id)
+    if not session:
+        return jsonify({'success': False, 'message': 'Upload not found.'}), 404
+    return session_response(session)
+
+@uploads_bp.route('/upload-sessions/<session_id>', methods=['PUT', 'PATCH'])
+@jwt_required()
+@ingest(MAX_CHUNK_SIZE)
+def put_upload_chunk(session_id):
+    """Append the raw request body at the ``Upload-Offset`` header"""
+    session = owned_session(session_id)
+    if not session:
+        return jsonify({'success': False, 'message': 'Upload not found.'}), 404
+    try:
+        offset = int(request.headers.get('Upload-Offset', ''))
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Upload-Offset header is required.'}), 400
+    try:
+        upload_sessions.write_chunk(session, offset, request.stream, request.content_length)
+    except UploadError as e:
+        db.session.refresh(session)
+        return error_response(e, session)
+    db.session.refresh(session)
+    return session_response(session)
+
+@uploads_bp.route('/upload-sessions/<session_id>/complete', methods=['POST'])
+@jwt_required()
+def complete_upload_session(session_id):
+    """Verify the checksum and store the file; the session id can then be used as a post's upload_id"""
+    session = owned_session(session_id)
+    if not session:
+        return jsonify({'success': False, 'message': 'Upload not found.'}), 404
+    data = request.get_json(silent=True) or {}
+    try:
+        upload_sessions.complete_session(session, checksum=data.get('checksum'))
+    except UploadError as e:
+        return error_response(e, session)
+    db.session.commit()
+    print(f'[UPLOADS] Session {session.id} complete: {session.media_url}')
+    return session_response(session)
+
+@uploads_bp.route('/upload-sessions/<session_id>', methods=['DELETE'])
+@jwt_required()
+def delete_upload_session(session_id):
+    session = owned_session(session_id)
+    if not session:
+        return jsonify({'success': False, 'message': 'Upload not found.'}), 404
+    upload_sessions.discard_session(session)
+    db.session.commit()
+    return jsonify({'success': True})
@@ -1,4 +1,5 @@
 import os
+import json
 from datetime import timedelta
 import secrets
 
@@ -10,12 +11,8 @@ class Config:
     DATABASE_URL = os.environ.get('DATABASE_URL')
     if DATABASE_URL and DATABASE_URL.startswith('postgres://'):
         DATABASE_URL = DATABASE_URL.replace('postgres://', 'postgresql://', 1)
-<<<<<<< HEAD
-    SQLALCHEMY_DATABASE_URI = DATABASE_URL
-=======
     # Use SQLite for local development if DATABASE_URL is not set
     SQLALCHEMY_DATABASE_URI = DATABASE_URL or 'sqlite:///local.db'
->>>>>>> fix-e22b509-stabilize
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
     # JWT
@@ -24,4 +21,63 @@ class Config:
 
     # CORS
     CORS_HEADERS = 'Content-Type'
-    CORS_ORIGINS = os.environ.get('CORS_ORIGINS', 'https://prok-frontend-e44d.onrender.com').split(',') 
\ No newline at end of file
+    CORS_ORIGINS = os.environ.get('CORS_ORIGINS', 'https://prok-frontend-e44d.onrender.com').split(',') 
+
+    # Cache (memory, sqlite or redis; see services/cache.py)
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'memory')
+    CACHE_URL = os.environ.get('CACHE_URL')
+    CACHE_DEFAULT_TTL = int(os.environ.get('CACHE_DEFAULT_TTL', 300))
+    CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES', 2048))
+
+    # Post view counting (buffered per worker, see services/view_counter.py)
+    VIEW_FLUSH_INTERVAL = int(os.environ.get('VIEW_FLUSH_INTERVAL', 10))
+    VIEW_MAX_PENDING = int(os.environ.get('VIEW_MAX_PENDING', 5000))
+
+    # Home timeline fan-out (see services/timeline.py)
+    TIMELINE_FANOUT_MAX_FOLLOWERS = int(os.environ.get('TIMELINE_FANOUT_MAX_FOLLOWERS', 5000))
+    TIMELINE_MAX_ENTRIES = int(os.environ.get('TIMELINE_MAX_ENTRIES', 800))
+
+    # "Top" feed ranking (see services/ranking.py); weights are a JSON object
+    # overriding any of recency, likes, comments, views, category_affinity, author_affinity
+    FEED_RANK_WEIGHTS = json.loads(os.environ.get('FEED_RANK_WEIGHTS', '{}'))
+    FEED_RANK_HALF_LIFE_HOURS = float(os.environ.get('FEED_RANK_HALF_LIFE_HOURS', 24))
+    FEED_RANK_CANDIDATES = int(os.environ.get('FEED_RANK_CANDIDATES', 1000))
+
+    # Response compression (see services/compression.py; brotli is optional)
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))
+    COMPRESS_LEVEL = int(os.environ.get('COMPRESS_LEVEL', 6))
+    COMPRESS_BR_LEVEL = int(os.environ.get('COMPRESS_BR_LEVEL', 5))
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'false').lower() == 'true'
+
+    # Background image processing (processes per gunicorn worker, queued + running jobs)
+    IMAGE_WORKERS = int(os.environ.get('IMAGE_WORKERS', 2))
+    IMAGE_QUEUE_SIZE = int(os.environ.get('IMAGE_QUEUE_SIZE', 16))
+
+    # Upload serving (see services/media_files.py): '' serves files from Python,
+    # 'x-accel' hands them to nginx (internal location MEDIA_ACCEL_PREFIX mapped
+    # to static/uploads), 'x-sendfile' to Apache/lighttpd
+    MEDIA_OFFLOAD = os.environ.get('MEDIA_OFFLOAD', '').lower()
+    MEDIA_ACCEL_PREFIX = os.environ.get('MEDIA_ACCEL_PREFIX', '/internal/uploads/')
+
+    # Upload ingestion (see services/ingest.py): request body cap for routes
+    # without their own @ingest limit, and the largest accepted image
+    MAX_CONTENT_LENGTH = int(os.environ.get('MAX_CONTENT_LENGTH', 16 * 1024 * 1024))
+    UPLOAD_MAX_IMAGE_PIXELS = int(os.environ.get('UPLOAD_MAX_IMAGE_PIXELS', 40_000_000))
+
+    # Password hashing (see services/passwords.py): pbkdf2, scrypt or argon2
+    # (argon2 needs argon2-cffi); outdated hashes are upgraded on login
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'pbkdf2')
+    PASSWORD_PBKDF2_ITERATIONS = int(os.environ.get('PASSWORD_PBKDF2_ITERATIONS', 600000))
+    PASSWORD_SCRYPT_N = int(os.environ.get('PASSWORD_SCRYPT_N', 32768))
+    PASSWORD_SCRYPT_R = int(os.environ.get('PASSWORD_SCRYPT_R', 8))
+    PASSWORD_SCRYPT_P = int(os.environ.get('PASSWORD_SCRYPT_P', 1))
+    PASSWORD_ARGON2_TIME_COST = int(os.environ.get('PASSWORD_ARGON2_TIME_COST', 2))
+    PASSWORD_ARGON2_MEMORY_COST = int(os.environ.get('PASSWORD_ARGON2_MEMORY_COST', 19456))
+    PASSWORD_ARGON2_PARALLELISM = int(os.environ.get('PASSWORD_ARGON2_PARALLELISM', 1))
+    # Hashing threads per gunicorn worker (default: CPU count) and queued + running hashes
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 0)) or None
+    PASSWORD_HASH_QUEUE = int(os.environ.get('PASSWORD_HASH_QUEUE', 0)) or None
+
+    # Authenticated identity cache (see services/identity.py), per process
+    IDENTITY_CACHE_SIZE = int(os.environ.get('IDENTITY_CACHE_SIZE', 4096))
+    IDENTITY_CACHE_TTL = int(os.environ.get('IDENTITY_CACHE_TTL', 30))
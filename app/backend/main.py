@@ -2,7 +2,16 @@ from flask import Flask, jsonify
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
 from config import Config
-from extensions import db
+from extensions import db, cache
+from services.search import ensure_search_index
+from services.view_counter import view_counter
+from services.compression import Compress
+from services.json_provider import FastJSONProvider
+from services.image_jobs import image_processor
+from services.media_files import send_media
+from services.ingest import IngestRequest
+from services.passwords import password_hashing
+from services.identity import identity_cache
 import os
 
 # Only load dotenv in local development
@@ -12,6 +21,8 @@ if os.environ.get('FLASK_ENV') != 'production':
 
 # Create Flask app
 app = Flask(__name__, static_folder='static')
+app.request_class = IngestRequest
+app.json = FastJSONProvider(app)
 app.config.from_object(Config)
 
 # Enable CORS for allowed origins
@@ -25,15 +36,23 @@ CORS(app,
 # Initialize extensions
 jwt = JWTManager(app)
 db.init_app(app)
+cache.init_app(app)
+view_counter.init_app(app)
+compress = Compress(app)
+image_processor.init_app(app)
+password_hashing.init_app(app)
+identity_cache.init_app(app)
 
 # Register blueprints
-from api import auth_bp, profile_bp, posts_bp, feed_bp, jobs_bp, messaging_bp
+from api import auth_bp, profile_bp, posts_bp, feed_bp, jobs_bp, messaging_bp, media_bp, uploads_bp
 app.register_blueprint(auth_bp)
 app.register_blueprint(profile_bp)
 app.register_blueprint(posts_bp)
 app.register_blueprint(feed_bp)
 app.register_blueprint(jobs_bp)
 app.register_blueprint(messaging_bp)
+app.register_blueprint(media_bp)
+app.register_blueprint(uploads_bp)
 
 @app.route('/')
 def home():
@@ -57,11 +76,23 @@ def api_health():
         print(f"[API HEALTH ERROR] {e}")
         return jsonify({'status': 'error', 'error': str(e)}), 500
 
+# Legacy upload URLs (e.g. post videos) take precedence over the generic static route
+@app.route('/static/uploads/<path:filename>')
+def static_upload(filename):
+    return send_media(filename)
+
+@app.route('/api/metrics/compression')
+def compression_metrics():
+    if not app.config.get('METRICS_ENABLED'):
+        return jsonify({'error': 'Not found'}), 404
+    return jsonify({'success': True, 'routes': compress.snapshot()})
+
 def setup_database():
     """Setup database tables"""
     with app.app_context():
         try:
             db.create_all()
+            ensure_search_index()
             print(" 705 Database tables created successfully!")
         except Exception as e:
             print(f" 74c Database setup failed: {e}")
@@ -0,0 +1,64 @@
+"""add posts full-text search index
+
+Revision ID: 8d2e5b0a9c17
+Revises: 3f9a1c7d2b64
+Create Date: 2026-10-18 10:03:51.904477
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d2e5b0a9c17'
+down_revision = '3f9a1c7d2b64'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        # Generated column keeps the vector in sync with content/category on every write
+        op.execute(
+            "ALTER TABLE posts ADD COLUMN IF NOT EXISTS search_vector tsvector "
+            "GENERATED ALWAYS AS ("
+            "setweight(to_tsvector('english', coalesce(category, '')), 'A') || "
+            "setweight(to_tsvector('english', coalesce(content, '')), 'B')"
+            ") STORED"
+        )
+        op.execute("CREATE INDEX IF NOT EXISTS ix_posts_search_vector ON posts USING gin (search_vector)")
+    elif dialect == 'sqlite':
+        op.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5("
+            "content, category, content='posts', content_rowid='id', prefix='2 3')"
+        )
+        op.execute(
+            "CREATE TRIGGER IF NOT EXISTS posts_fts_ai AFTER INSERT ON posts BEGIN "
+            "INSERT INTO posts_fts(rowid, content, category) VALUES (new.id, new.content, new.category); "
+            "END"
+        )
+        op.execute(
+            "CREATE TRIGGER IF NOT EXISTS posts_fts_ad AFTER DELETE ON posts BEGIN "
+            "INSERT INTO posts_fts(posts_fts, rowid, content, category) VALUES ('delete', old.id, old.content, old.category); "
+            "END"
+        )
+        op.execute(
+            "CREATE TRIGGER IF NOT EXISTS posts_fts_au AFTER UPDATE OF content, category ON posts BEGIN "
+            "INSERT INTO posts_fts(posts_fts, rowid, content, category) VALUES ('delete', old.id, old.content, old.category); "
+            "INSERT INTO posts_fts(rowid, content, category) VALUES (new.id, new.content, new.category); "
+            "END"
+        )
+        op.execute("INSERT INTO posts_fts(posts_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_posts_search_vector")
+        op.execute("ALTER TABLE posts DROP COLUMN IF EXISTS search_vector")
+    elif dialect == 'sqlite':
+        op.execute("DROP TRIGGER IF EXISTS posts_fts_au")
+        op.execute("DROP TRIGGER IF EXISTS posts_fts_ad")
+        op.execute("DROP TRIGGER IF EXISTS posts_fts_ai")
+        op.execute("DROP TABLE IF EXISTS posts_fts")
@@ -0,0 +1,107 @@
+"""move post tags from JSON text into post_tags table
+
+Revision ID: c41b7e93d5a2
+Revises: 8d2e5b0a9c17
+Create Date: 2026-10-18 11:27:06.552190
+
+"""
+import json
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c41b7e93d5a2'
+down_revision = '8d2e5b0a9c17'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+MAX_TAG_LENGTH = 100
+
+posts = sa.table('posts', sa.column('id', sa.Integer), sa.column('tags', sa.Text))
+post_tags = sa.table(
+    'post_tags',
+    sa.column('post_id', sa.Integer),
+    sa.column('tag', sa.String),
+    sa.column('position', sa.SmallInteger),
+)
+
+
+def _parse_tags(raw):
+    try:
+        values = json.loads(raw) if raw else []
+    except ValueError:
+        return []
+    names = []
+    for value in values if isinstance(values, list) else []:
+        tag = str(value).strip()[:MAX_TAG_LENGTH]
+        if tag and tag not in names:
+            names.append(tag)
+    return names
+
+
+def upgrade():
+    op.create_table('post_tags',
+    sa.Column('post_id', sa.Integer(), nullable=False),
+    sa.Column('tag', sa.String(length=MAX_TAG_LENGTH), nullable=False),
+    sa.Column('position', sa.SmallInteger(), nullable=False),
+    sa.ForeignKeyConstraint(['post_id'], ['posts.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('post_id', 'tag')
+    )
+    op.create_index('ix_post_tags_tag_post_id', 'post_tags', ['tag', 'post_id'], unique=False)
+
+    # Backfill in id-ordered batches so large tables never load at once
+    bind = op.get_bind()
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(posts.c.id, posts.c.tags)
+            .where(posts.c.id > last_id, posts.c.tags.isnot(None))
+            .order_by(posts.c.id)
+            .limit(BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+        links = [
+            {'post_id': post_id, 'tag': tag, 'position': position}
+            for post_id, raw in rows
+            for position, tag in enumerate(_parse_tags(raw))
+        ]
+        if links:
+            bind.execute(post_tags.insert(), links)
+        last_id = rows[-1][0]
+
+    with op.batch_alter_table('posts', schema=None) as batch_op:
+        batch_op.drop_column('tags')
+
+
+def downgrade():
+    with op.batch_alter_table('posts', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('tags', sa.Text(), nullable=True))
+
+    bind = op.get_bind()
+    last_id = 0
+    while True:
+        post_ids = [row[0] for row in bind.execute(
+            sa.select(post_tags.c.post_id).distinct()
+            .where(post_tags.c.post_id > last_id)
+            .order_by(post_tags.c.post_id)
+            .limit(BATCH_SIZE)
+        )]
+        if not post_ids:
+            break
+        grouped = {}
+        for post_id, tag in bind.execute(
+            sa.select(post_tags.c.post_id, post_tags.c.tag)
+            .where(post_tags.c.post_id.in_(post_ids))
+            .order_by(post_tags.c.post_id, post_tags.c.position)
+        ):
+            grouped.setdefault(post_id, []).append(tag)
+        for post_id, tags in grouped.items():
+            bind.execute(posts.update().where(posts.c.id == post_id).values(tags=json.dumps(tags)))
+        last_id = post_ids[-1]
+
+    op.drop_index('ix_post_tags_tag_post_id', table_name='post_tags')
+    op.drop_table('post_tags')
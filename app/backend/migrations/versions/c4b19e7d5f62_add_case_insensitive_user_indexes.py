@@ -0,0 +1,38 @@
+"""add case-insensitive user indexes
+
+Revision ID: c4b19e7d5f62
+Revises: a7e4c2d91b35
+Create Date: 2026-10-19 00:21:07.336419
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4b19e7d5f62'
+down_revision = 'a7e4c2d91b35'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    # Accounts that differ only by case must be merged by hand before the
+    # unique indexes can be built; list them instead of failing obscurely
+    for column in ('email', 'username'):
+        duplicates = bind.execute(sa.text(
+            f"SELECT lower({column}) FROM users GROUP BY lower({column}) HAVING count(*) > 1"
+        )).scalars().all()
+        if duplicates:
+            raise RuntimeError(f'users.{column} has case-insensitive duplicates: {", ".join(duplicates)}')
+
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.create_index('ux_users_email_lower', [sa.text('lower(email)')], unique=True)
+        batch_op.create_index('ux_users_username_lower', [sa.text('lower(username)')], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_index('ux_users_username_lower')
+        batch_op.drop_index('ux_users_email_lower')
@@ -0,0 +1,78 @@
+"""add tag_stats and tag_activity counters
+
+Revision ID: e7a30c5f41d8
+Revises: c41b7e93d5a2
+Create Date: 2026-10-18 13:40:22.731064
+
+"""
+from datetime import datetime, timedelta
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7a30c5f41d8'
+down_revision = 'c41b7e93d5a2'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+ACTIVITY_RETENTION = timedelta(days=8)
+
+posts = sa.table('posts', sa.column('id', sa.Integer), sa.column('created_at', sa.DateTime))
+post_tags = sa.table('post_tags', sa.column('post_id', sa.Integer), sa.column('tag', sa.String))
+
+
+def upgrade():
+    op.create_table('tag_stats',
+    sa.Column('tag', sa.String(length=100), nullable=False),
+    sa.Column('post_count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('tag')
+    )
+    op.create_index('ix_tag_stats_post_count_tag', 'tag_stats', ['post_count', 'tag'], unique=False)
+    op.create_table('tag_activity',
+    sa.Column('bucket', sa.DateTime(), nullable=False),
+    sa.Column('tag', sa.String(length=100), nullable=False),
+    sa.Column('post_count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('bucket', 'tag')
+    )
+
+    bind = op.get_bind()
+    bind.execute(sa.text(
+        "INSERT INTO tag_stats (tag, post_count) "
+        "SELECT tag, COUNT(*) FROM post_tags GROUP BY tag"
+    ))
+
+    # Hour truncation differs per dialect, so bucket recent posts in Python
+    since = datetime.utcnow() - ACTIVITY_RETENTION
+    buckets = {}
+    last_id = 0
+    while True:
+        recent = bind.execute(
+            sa.select(posts.c.id, posts.c.created_at)
+            .where(posts.c.id > last_id, posts.c.created_at >= since)
+            .order_by(posts.c.id)
+            .limit(BATCH_SIZE)
+        ).fetchall()
+        if not recent:
+            break
+        created = {post_id: created_at for post_id, created_at in recent}
+        for post_id, tag in bind.execute(
+            sa.select(post_tags.c.post_id, post_tags.c.tag).where(post_tags.c.post_id.in_(list(created)))
+        ):
+            key = (created[post_id].replace(minute=0, second=0, microsecond=0), tag)
+            buckets[key] = buckets.get(key, 0) + 1
+        last_id = recent[-1][0]
+    if buckets:
+        op.bulk_insert(sa.table('tag_activity',
+            sa.column('bucket', sa.DateTime),
+            sa.column('tag', sa.String),
+            sa.column('post_count', sa.Integer),
+        ), [{'bucket': bucket, 'tag': tag, 'post_count': count} for (bucket, tag), count in buckets.items()])
+
+
+def downgrade():
+    op.drop_table('tag_activity')
+    op.drop_index('ix_tag_stats_post_count_tag', table_name='tag_stats')
+    op.drop_table('tag_stats')
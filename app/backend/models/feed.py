@@ -0,0 +1,39 @@
+from datetime import datetime
+from extensions import db
+
+class Follow(db.Model):
+    __tablename__ = 'follows'
+    follower_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    followee_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        # Fan-out reads "everyone following this author"
+        db.Index('ix_follows_followee_id_follower_id', 'followee_id', 'follower_id'),
+    )
+
+    def __repr__(self):
+        return f'<Follow {self.follower_id} -> {self.followee_id}>'
+
+class FollowStat(db.Model):
+    """Follower counts used to pick fan-out-on-write vs fan-out-on-read"""
+    __tablename__ = 'follow_stats'
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    follower_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<FollowStat {self.user_id}: {self.follower_count}>'
+
+class TimelineEntry(db.Model):
+    """A post pushed into a user's home timeline"""
+    __tablename__ = 'timeline_entries'
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    post_id = db.Column(db.Integer, db.ForeignKey('posts.id', ondelete='CASCADE'), primary_key=True)
+    created_at = db.Column(db.DateTime, nullable=False)  # copied from the post, the sort key
+
+    __table_args__ = (
+        db.Index('ix_timeline_entries_user_id_created_at', 'user_id', 'created_at', 'post_id'),
+    )
+
+    def __repr__(self):
+        return f'<TimelineEntry User {self.user_id} Post {self.post_id}>'
@@ -0,0 +1,83 @@
+from datetime import datetime
+from extensions import db
+
+class ImageJob(db.Model):
+    """An uploaded image waiting for (or done with) background processing"""
+    __tablename__ = 'image_jobs'
+    id = db.Column(db.String(36), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    kind = db.Column(db.String(20), nullable=False)  # avatar, banner, post
+    post_id = db.Column(db.Integer, db.ForeignKey('posts.id', ondelete='CASCADE'))  # kind == 'post'
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, done, failed
+    url = db.Column(db.String(256))
+    error = db.Column(db.String(500))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_image_jobs_user_id_created_at', 'user_id', 'created_at'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'post_id': self.post_id,
+            'status': self.status,
+            'url': self.url,
+            'error': self.error,
+            'created_at': self.created_at,
+            'updated_at': self.updated_at
+        }
+
+    def __repr__(self):
+        return f'<ImageJob {self.id} {self.kind} {self.status}>'
+
+class MediaObject(db.Model):
+    """A content-addressed file under static/uploads and its reference count"""
+    __tablename__ = 'media_objects'
+    key = db.Column(db.String(100), primary_key=True)  # ab/cd/<blake2b hex>.<ext>
+    refcount = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        # Garbage collection scans for unreferenced objects
+        db.Index('ix_media_objects_refcount', 'refcount'),
+    )
+
+    def __repr__(self):
+        return f'<MediaObject {self.key} x{self.refcount}>'
+
+class UploadSession(db.Model):
+    """A resumable chunked upload; the file grows at upload_root()/tmp/<id>.part"""
+    __tablename__ = 'upload_sessions'
+    id = db.Column(db.String(36), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    filename = db.Column(db.String(255), nullable=False)
+    size = db.Column(db.BigInteger, nullable=False)
+    offset = db.Column(db.BigInteger, nullable=False, default=0)
+    checksum = db.Column(db.String(80))  # sha256:<hex>, verified on completion
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, complete
+    media_url = db.Column(db.String(255))  # stored object once complete; holds a reference
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        # Expired sessions are purged by age
+        db.Index('ix_upload_sessions_updated_at', 'updated_at'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'filename': self.filename,
+            'size': self.size,
+            'offset': self.offset,
+            'status': self.status,
+            'media_url': self.media_url,
+            'created_at': self.created_at,
+            'updated_at': self.updated_at
+        }
+
+    def __repr__(self):
+        return f'<UploadSession {self.id} {self.offset}/{self.size}>'
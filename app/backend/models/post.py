@@ -1,6 +1,8 @@
 from datetime import datetime
 from extensions import db
 
+MAX_TAG_LENGTH = 100
+
 class Post(db.Model):
     __tablename__ = 'posts'
     id = db.Column(db.Integer, primary_key=True)
@@ -8,14 +10,25 @@ class Post(db.Model):
     content = db.Column(db.Text, nullable=False)
     media_url = db.Column(db.String(255), nullable=True)
     media_type = db.Column(db.String(50), nullable=True)
+    # Resized image variants, filled in by the image pool (see services/image_jobs.py)
+    media_variants = db.Column(db.JSON, nullable=True)
     category = db.Column(db.String(100), nullable=True)
-    tags = db.Column(db.Text, nullable=True)  # JSON string of tags
     visibility = db.Column(db.String(20), default='public')  # public, private, friends
     likes_count = db.Column(db.Integer, default=0)
     views_count = db.Column(db.Integer, default=0)
     comments_count = db.Column(db.Integer, default=0)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Tags live in post_tags; selectin loads a whole page's tags in one query
+    tag_links = db.relationship('PostTag', backref='post', lazy='selectin',
+                                order_by='PostTag.position', cascade='all, delete-orphan')
+
+    __table_args__ = (
+        # Backs cursor pagination on the default (created_at, id) ordering
+        db.Index('ix_posts_created_at_id', 'created_at', 'id'),
+        # Per-author recent posts (timeline pulls and follow backfill)
+        db.Index('ix_posts_user_id_created_at', 'user_id', 'created_at'),
+    )
 
     def __repr__(self):
         return f'<Post {self.id} by User {self.user_id}>'
@@ -27,30 +40,60 @@ class Post(db.Model):
             'content': self.content,
             'media_url': self.media_url,
             'media_type': self.media_type,
+            'media_variants': self.media_variants,
             'category': self.category,
             'tags': self.get_tags(),
             'visibility': self.visibility,
             'likes_count': self.likes_count,
             'views_count': self.views_count,
             'comments_count': self.comments_count,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+            'created_at': self.created_at,
+            'updated_at': self.updated_at
         }
 
     def get_tags(self):
-        """Parse tags from JSON string to list"""
-        if not self.tags:
-            return []
-        try:
-            import json
-            return json.loads(self.tags)
-        except:
-            return []
+        """Return tag names in the order they were given"""
+        return [link.tag for link in self.tag_links]
 
     def set_tags(self, tags_list):
-        """Convert tags list to JSON string"""
-        if not tags_list:
-            self.tags = None
-        else:
-            import json
-            self.tags = json.dumps(tags_list)
+        """Replace the post's tags, keeping rows for tags that are unchanged"""
+        names = []
+        for tag in tags_list or []:
+            tag = str(tag).strip()[:MAX_TAG_LENGTH]
+            if tag and tag not in names:
+                names.append(tag)
+        existing = {link.tag: link for link in self.tag_links}
+        links = []
+        for position, tag in enumerate(names):
+            link = existing.get(tag) or PostTag(tag=tag)
+            link.position = position
+            links.append(link)
+        self.tag_links = links
+
+class PostTag(db.Model):
+    __tablename__ = 'post_tags'
+    post_id = db.Column(db.Integer, db.ForeignKey('posts.id', ondelete='CASCADE'), primary_key=True)
+    tag = db.Column(db.String(MAX_TAG_LENGTH), primary_key=True)
+    position = db.Column(db.SmallInteger, nullable=False, default=0)
+
+    __table_args__ = (
+        # Serves tag filters (tag -> post ids); the primary key covers post -> tags
+        db.Index('ix_post_tags_tag_post_id', 'tag', 'post_id'),
+    )
+
+    def __repr__(self):
+        return f'<PostTag {self.tag} on Post {self.post_id}>'
+
+class PostLike(db.Model):
+    __tablename__ = 'post_likes'
+    # The (user_id, post_id) key makes likes unique and serves "did I like these posts"
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    post_id = db.Column(db.Integer, db.ForeignKey('posts.id', ondelete='CASCADE'), primary_key=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_post_likes_post_id', 'post_id'),
+    )
+
+    def __repr__(self):
+        return f'<PostLike User {self.user_id} -> Post {self.post_id}>'
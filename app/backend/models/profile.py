@@ -13,30 +13,42 @@ class Profile(db.Model):
     skills = db.Column(db.JSON, default=list)  # List of skill names or dicts
     socials = db.Column(db.JSON, default=dict) # Dict of social links
     name = db.Column(db.String(100), default='')
+    # {variant: {'jpeg': url, 'webp': url, 'width', 'height'}} for thumb/card/full
+    avatar_variants = db.Column(db.JSON)
+    banner_variants = db.Column(db.JSON)
+    # Bumped on every profile write (including experiences/education); feeds ETags
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
     # Relationships
     experiences = db.relationship('Experience', backref='profile', cascade='all, delete-orphan')
     education = db.relationship('Education', backref='profile', cascade='all, delete-orphan')
 
+    def touch(self):
+        """Mark the profile as changed so cached representations are revalidated"""
+        self.version = (self.version or 0) + 1
+
     def serialize(self):
+        """The profile payload shared by GET and PUT /api/profile"""
         return {
             'id': self.id,
             'user_id': self.user_id,
             'avatar': self.avatar,
             'banner': self.banner,
-            'title': self.title,
-            'bio': self.bio,
-            'location': self.location,
-            'address': self.address,
-            'skills': self.skills,
-            'socials': self.socials,
-            'name': self.name,
+            'avatar_variants': self.avatar_variants,
+            'banner_variants': self.banner_variants,
+            'title': self.title or '',
+            'bio': self.bio or '',
+            'location': self.location or '',
+            'address': self.address or '',
+            'skills': self.skills or [],
+            'socials': self.socials or {},
+            'name': self.name or '',
             'experiences': [
                 {
                     'id': exp.id,
                     'title': exp.title,
                     'company': exp.company,
-                    'start_date': exp.start_date.isoformat() if exp.start_date else None,
-                    'end_date': exp.end_date.isoformat() if exp.end_date else None,
+                    'start_date': exp.start_date,
+                    'end_date': exp.end_date,
                     'description': exp.description
                 } for exp in self.experiences
             ],
@@ -46,8 +58,8 @@ class Profile(db.Model):
                     'school': edu.school,
                     'degree': edu.degree,
                     'field': edu.field,
-                    'start_date': edu.start_date.isoformat() if edu.start_date else None,
-                    'end_date': edu.end_date.isoformat() if edu.end_date else None
+                    'start_date': edu.start_date,
+                    'end_date': edu.end_date
                 } for edu in self.education
             ]
         }
@@ -0,0 +1,26 @@
+from extensions import db
+from .post import MAX_TAG_LENGTH
+
+class TagStat(db.Model):
+    """All-time number of posts carrying each tag"""
+    __tablename__ = 'tag_stats'
+    tag = db.Column(db.String(MAX_TAG_LENGTH), primary_key=True)
+    post_count = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        # Top-N is a backwards scan of this index
+        db.Index('ix_tag_stats_post_count_tag', 'post_count', 'tag'),
+    )
+
+    def __repr__(self):
+        return f'<TagStat {self.tag}: {self.post_count}>'
+
+class TagActivity(db.Model):
+    """Posts per tag, bucketed by the hour the posts were created in"""
+    __tablename__ = 'tag_activity'
+    bucket = db.Column(db.DateTime, primary_key=True)
+    tag = db.Column(db.String(MAX_TAG_LENGTH), primary_key=True)
+    post_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<TagActivity {self.bucket} {self.tag}: {self.post_count}>'
@@ -1,6 +1,8 @@
 from extensions import db
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload, selectinload
 from .profile import Profile
-from werkzeug.security import check_password_hash, generate_password_hash
+from services.passwords import password_hashing
 import re
 
 class User(db.Model):
@@ -11,8 +13,26 @@ class User(db.Model):
     password_hash = db.Column(db.String(512), nullable=False)
     profile = db.relationship('Profile', uselist=False, backref='user', cascade='all, delete-orphan')
 
+    __table_args__ = (
+        # Case-insensitive uniqueness; also serve the lower(...) lookups in by_login
+        db.Index('ux_users_email_lower', func.lower(email), unique=True),
+        db.Index('ux_users_username_lower', func.lower(username), unique=True),
+    )
+
+    @classmethod
+    def by_email(cls, email):
+        return cls.query.filter(func.lower(cls.email) == email.strip().lower())
+
+    @classmethod
+    def by_login(cls, identifier):
+        """One indexed lookup: by email when the identifier has an @ (usernames cannot), else by username"""
+        identifier = identifier.strip()
+        if '@' in identifier:
+            return cls.by_email(identifier)
+        return cls.query.filter(func.lower(cls.username) == identifier.lower())
+
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = password_hashing.hash_password(password)
 
     @staticmethod
     def is_password_complex(password):
@@ -28,7 +48,19 @@ class User(db.Model):
         return True
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        """Verify ``password``; a hash made with outdated parameters is replaced (the caller commits)"""
+        valid, new_hash = password_hashing.check_password(self.password_hash, password)
+        if new_hash:
+            self.password_hash = new_hash
+        return valid
+
+    @classmethod
+    def with_profile(cls):
+        """User query that loads profile and experiences in one JOIN and education in a second query"""
+        return cls.query.options(
+            joinedload(cls.profile).joinedload(Profile.experiences),
+            joinedload(cls.profile).selectinload(Profile.education)
+        )
 
     def serialize(self):
         return {
@@ -0,0 +1,92 @@
+"""Benchmark avatar uploads: inline Pillow work vs the background image pool.
+
+Simulates THREADS concurrent request threads (a gthread gunicorn worker)
+each handling uploads of large PNGs. "inline" decodes and encodes the
+avatar variants on the request thread like the old upload_avatar did with
+its single JPEG; "pool" only spools the file and submits it, which is all a
+request does now.
+
+Run from the repository root:  python app/backend/scripts/bench_image_uploads.py
+"""
+import io
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+sys.path.append('app/backend')
+
+from flask import Flask
+from PIL import Image
+from services.image_jobs import ImageProcessor, QueueFull
+from services.image_ops import process_variants
+
+UPLOADS = 48
+THREADS = 8
+IMAGE_SIZE = (2400, 1600)
+
+def make_png():
+    img = Image.linear_gradient('L').resize(IMAGE_SIZE).convert('RGB')
+    img = Image.blend(img, Image.effect_noise(IMAGE_SIZE, 20).convert('RGB'), 0.3)
+    output = io.BytesIO()
+    img.save(output, format='PNG')
+    return output.getvalue()
+
+def spool(data, workdir, i):
+    path = os.path.join(workdir, f'upload_{i}.png')
+    with open(path, 'wb') as f:
+        f.write(data)
+    return path
+
+def run(handle):
+    latencies = []
+    start = time.perf_counter()
+    def one(i):
+        t = time.perf_counter()
+        handle(i)
+        latencies.append(time.perf_counter() - t)
+    with ThreadPoolExecutor(THREADS) as pool:
+        list(pool.map(one, range(UPLOADS)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return UPLOADS / elapsed, latencies[len(latencies) // 2] * 1000, latencies[-1] * 1000
+
+if __name__ == '__main__':
+    data = make_png()
+    workdir = tempfile.mkdtemp()
+    try:
+        def inline(i):
+            process_variants(spool(data, workdir, i), workdir, f'inline_{i}', 'avatar')
+
+        app = Flask('bench')
+        app.config.update(IMAGE_WORKERS=os.cpu_count() or 2, IMAGE_QUEUE_SIZE=UPLOADS)
+        processor = ImageProcessor()
+        processor.init_app(app)
+        processor.submit(abs, 0, on_done=lambda result, error: None)  # start the pool outside the timing
+        remaining = threading.Semaphore(0)
+        rejected = []
+
+        def queued(i):
+            try:
+                processor.submit(process_variants, spool(data, workdir, i), workdir, f'pool_{i}', 'avatar',
+                                 on_done=lambda result, error: remaining.release())
+            except QueueFull:
+                rejected.append(i)
+
+        print(f'{UPLOADS} uploads of a {IMAGE_SIZE[0]}x{IMAGE_SIZE[1]} PNG ({len(data) / 1024:.0f} KiB), '
+              f'{THREADS} request threads, {processor.workers} pool processes')
+        rate, p50, worst = run(inline)
+        print(f'  inline : {rate:7.1f} uploads/s accepted  p50 {p50:7.1f} ms  max {worst:7.1f} ms')
+        drain_start = time.perf_counter()
+        rate, p50, worst = run(queued)
+        print(f'  pool   : {rate:7.1f} uploads/s accepted  p50 {p50:7.1f} ms  max {worst:7.1f} ms')
+        for _ in range(UPLOADS - len(rejected)):
+            remaining.acquire()
+        drain = time.perf_counter() - drain_start
+        print(f'           all processed in {drain:.2f} s ({(UPLOADS - len(rejected)) / drain:.1f} images/s), '
+              f'{len(rejected)} rejected')
+        processor.shutdown()
+    finally:
+        shutil.rmtree(workdir)
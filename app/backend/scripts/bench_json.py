@@ -0,0 +1,84 @@
+"""Benchmark JSON encoding of a 50-post page: stdlib jsonify vs FastJSONProvider.
+
+Run from the repository root:  python app/backend/scripts/bench_json.py
+"""
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+sys.path.append('app/backend')
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from services import json_provider
+from services.json_provider import FastJSONProvider, stream_json
+
+PAGE_SIZE = 50
+REPEATS = 200
+
+def make_page(n):
+    now = datetime.utcnow()
+    words = ['design', 'python', 'career', 'hiring', 'remote', 'startup', 'product', 'data']
+    posts = []
+    for i in range(n):
+        created = now - timedelta(minutes=random.randint(0, 60 * 24 * 30))
+        posts.append({
+            'id': i + 1,
+            'user_id': random.randint(1, 500),
+            'content': ' '.join(random.choices(words, k=random.randint(20, 200))),
+            'media_url': None,
+            'media_type': None,
+            'category': random.choice(['tech', 'design', 'career']),
+            'tags': random.sample(words, 3),
+            'visibility': 'public',
+            'likes_count': random.randint(0, 500),
+            'views_count': random.randint(0, 5000),
+            'comments_count': random.randint(0, 50),
+            'created_at': created,
+            'updated_at': created,
+        })
+    return posts
+
+def stdlib_page(posts):
+    # What the old code did: isoformat every timestamp, then encode the whole page
+    return [dict(p, created_at=p['created_at'].isoformat(), updated_at=p['updated_at'].isoformat()) for p in posts]
+
+def timed(app, fn):
+    best = float('inf')
+    with app.test_request_context():
+        for _ in range(REPEATS):
+            start = time.perf_counter()
+            body = fn()
+            best = min(best, time.perf_counter() - start)
+        tracemalloc.start()
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return best * 1000, peak / 1024, body
+
+if __name__ == '__main__':
+    random.seed(7)
+    posts = make_page(PAGE_SIZE)
+    pagination = {'page': 1, 'per_page': PAGE_SIZE, 'total': 5000, 'pages': 100, 'has_next': True, 'has_prev': False}
+
+    stdlib_app = Flask('stdlib')
+    stdlib_app.json = DefaultJSONProvider(stdlib_app)
+    fast_app = Flask('fast')
+    fast_app.json = FastJSONProvider(fast_app)
+
+    results = [
+        ('stdlib jsonify', *timed(stdlib_app, lambda: stdlib_app.json.response(
+            {'success': True, 'posts': stdlib_page(posts), 'pagination': pagination}).get_data())),
+        ('fast provider', *timed(fast_app, lambda: fast_app.json.response(
+            {'success': True, 'posts': posts, 'pagination': pagination}).get_data())),
+        # Chunks are consumed as a WSGI server would, without joining them
+        ('fast streamed', *timed(fast_app, lambda: sum(map(len, stream_json(
+            {'success': True, 'pagination': pagination}, 'posts', iter(posts)).response)))),
+    ]
+
+    backend = 'orjson' if json_provider.orjson is not None else 'stdlib fallback'
+    print(f'{PAGE_SIZE}-post page ({len(results[0][3]) / 1024:.1f} KiB), best of {REPEATS}, provider backend: {backend}')
+    baseline = results[0][1]
+    for name, ms, peak_kib, body in results:
+        print(f'  {name:15}: {ms:7.3f} ms  {baseline / ms:5.1f}x  peak {peak_kib:7.1f} KiB')
@@ -0,0 +1,69 @@
+"""Benchmark password hashing policies: logins per second per core.
+
+For each policy, times verifying a password on one thread (one login's
+hashing cost on one core), then THREADS concurrent request threads logging
+in through the PasswordHashing pool. The pool result divided by the number
+of cores it used gives logins/s/core under load; it should stay close to the
+single thread number, with the queue bound turning excess load into Busy
+(503) instead of unbounded latency.
+
+Run from the repository root:  python app/backend/scripts/bench_passwords.py
+"""
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+sys.path.append('app/backend')
+
+from services.passwords import PasswordHashing, Busy, argon2
+
+LOGINS = 32
+THREADS = 8
+PASSWORD = 'Correct-Horse-9'
+
+POLICIES = [
+    ('pbkdf2 600k (werkzeug default)', {'method': 'pbkdf2', 'pbkdf2_iterations': 600000}),
+    ('pbkdf2 210k', {'method': 'pbkdf2', 'pbkdf2_iterations': 210000}),
+    ('scrypt n=2^15 r=8 p=1', {'method': 'scrypt', 'scrypt_params': (2**15, 8, 1)}),
+    ('scrypt n=2^14 r=8 p=1', {'method': 'scrypt', 'scrypt_params': (2**14, 8, 1)}),
+]
+if argon2 is not None:
+    POLICIES.append(('argon2id t=2 m=19MiB p=1', {'method': 'argon2', 'argon2_params': (2, 19456, 1)}))
+
+def make_hashing(settings):
+    hashing = PasswordHashing()
+    for name, value in settings.items():
+        setattr(hashing, name, value)
+    return hashing
+
+def single_thread(hashing, stored, rounds=4):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        assert hashing._check(stored, PASSWORD)[0]
+    return rounds / (time.perf_counter() - start)
+
+def pooled(hashing, stored):
+    busy = 0
+    def login(_):
+        nonlocal busy
+        try:
+            assert hashing.check_password(stored, PASSWORD)[0]
+        except Busy:
+            busy += 1
+    start = time.perf_counter()
+    with ThreadPoolExecutor(THREADS) as requests:
+        list(requests.map(login, range(LOGINS)))
+    return (LOGINS - busy) / (time.perf_counter() - start), busy
+
+if __name__ == '__main__':
+    cores = os.cpu_count() or 1
+    print(f'{cores} cores, {THREADS} request threads, {LOGINS} logins per policy')
+    print(f"{'policy':34} {'1 thread/s':>11} {'pool/s':>8} {'pool/s/core':>12} {'busy':>5}")
+    for label, settings in POLICIES:
+        hashing = make_hashing(settings)
+        hashing.workers, hashing.queue_size = cores, cores * 8
+        stored = hashing.make_hash(PASSWORD)
+        single = single_thread(hashing, stored)
+        throughput, busy = pooled(hashing, stored)
+        hashing.shutdown()
+        print(f'{label:34} {single:11.1f} {throughput:8.1f} {throughput / cores:12.1f} {busy:5d}')
@@ -0,0 +1 @@
+# Shared backend services used by the API blueprints
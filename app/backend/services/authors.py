@@ -0,0 +1,39 @@
+"""Author summaries for post cards.
+
+A page of posts needs the author's username, name, title and avatar (with its
+resized variants) for every card. Summaries are cached per author (``author:{id}``, tagged ``user:{id}``
+so profile writes retire them) and the misses of a whole page are loaded with
+one ``IN (...)`` query.
+"""
+from extensions import db, cache
+from models.user import User
+from models.profile import Profile
+
+AUTHOR_CACHE_TTL = 60  # seconds
+
+def _load_summaries(keys):
+    user_ids = [int(key.split(':', 1)[1]) for key in keys]
+    rows = db.session.query(
+        User.id, User.username, Profile.name, Profile.title, Profile.avatar, Profile.avatar_variants
+    ).outerjoin(Profile, Profile.user_id == User.id).filter(User.id.in_(user_ids))
+    return {
+        f'author:{user_id}': {
+            'id': user_id,
+            'username': username,
+            'name': name or '',
+            'title': title or '',
+            'avatar': avatar,
+            'avatar_variants': avatar_variants
+        }
+        for user_id, username, name, title, avatar, avatar_variants in rows
+    }
+
+def author_summaries(user_ids):
+    """Map user id -> author summary; unknown ids are left out"""
+    found = cache.get_or_set_many(
+        [f'author:{user_id}' for user_id in user_ids if user_id is not None],
+        _load_summaries,
+        ttl=AUTHOR_CACHE_TTL,
+        tags_for=lambda key: (f"user:{key.split(':', 1)[1]}",)
+    )
+    return {summary['id']: summary for summary in found.values()}
@@ -0,0 +1,464 @@
+"""Shared cache with per-key TTLs, LRU bounds, tag invalidation and single-flight.
+
+Backends (``CACHE_BACKEND``):
+- ``memory``: per-process LRU. Invalidation only reaches the current worker;
+  TTLs bound how stale other workers can be.
+- ``sqlite``: a WAL-mode SQLite file (``CACHE_URL`` is its path) shared by
+  every worker on the host, stdlib only.
+- ``redis``: any Redis-compatible server at ``CACHE_URL``; needs the optional
+  ``redis`` package.
+
+The shared backends store values as JSON, never pickle, so whoever can write
+the cache file or server cannot run code in the app. Cached values must be
+JSON-compatible (dicts, lists, strings, numbers, None); dates come back as
+ISO 8601 strings and tuples as lists.
+
+Entries can carry tags. A tag is a generation counter that is folded into the
+stored key, so ``invalidate('posts')`` retires every entry tagged ``posts`` in
+one O(1) write and stale entries simply age out of the LRU. Models registered
+with ``watch()`` invalidate their tags automatically when a transaction that
+wrote them commits.
+"""
+from collections import OrderedDict
+import os
+from datetime import date
+import json
+import sqlite3
+import threading
+import time
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+try:
+    import redis
+except ImportError:  # optional dependency, only needed for CACHE_BACKEND=redis
+    redis = None
+
+MISSING = object()
+
+def _default(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} cannot be cached')
+
+def encode(value):
+    return json.dumps(value, default=_default, separators=(',', ':')).encode()
+
+def decode(data):
+    """The stored value, or MISSING for anything that is not our JSON (e.g. old pickles)"""
+    try:
+        return json.loads(data)
+    except ValueError:
+        return MISSING
+
+class MemoryBackend:
+    """In-process LRU dict with per-key expiry"""
+    shared = False
+
+    def __init__(self, max_entries=2048):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return MISSING
+            value, expires = item
+            if expires is not None and expires <= time.time():
+                del self._data[key]
+                return MISSING
+            self._data.move_to_end(key)
+            return value
+
+    def get_many(self, keys):
+        found = {}
+        for key in keys:
+            value = self.get(key)
+            if value is not MISSING:
+                found[key] = value
+        return found
+
+    def set(self, key, value, ttl=None):
+        expires = time.time() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def set_many(self, mapping, ttl=None):
+        for key, value in mapping.items():
+            self.set(key, value, ttl)
+
+    def add(self, key, value, ttl=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None and (item[1] is None or item[1] > time.time()):
+                return False
+        self.set(key, value, ttl)
+        return True
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def get_generations(self, names):
+        with self._lock:
+            return {name: self._generations.get(name, 0) for name in names}
+
+    def bump_generation(self, name):
+        with self._lock:
+            self._generations[name] = self._generations.get(name, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._generations.clear()
+
+class SQLiteBackend:
+    """Cross-worker cache stored in a local SQLite file.
+
+    Recency is tracked with an ``accessed`` timestamp refreshed at most every
+    TOUCH_INTERVAL seconds, which keeps hits read-mostly while still giving
+    approximate LRU eviction once ``max_entries`` is exceeded.
+    """
+    shared = True
+    TOUCH_INTERVAL = 30
+    PRUNE_EVERY = 100  # sets between size checks
+
+    def __init__(self, path, max_entries=2048):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._sets = 0
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS cache_entries ('
+                'key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL, accessed REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS ix_cache_entries_accessed ON cache_entries (accessed)')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS cache_generations (name TEXT PRIMARY KEY, value INTEGER NOT NULL)'
+            )
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key):
+        return self.get_many([key]).get(key, MISSING)
+
+    def get_many(self, keys):
+        if not keys:
+            return {}
+        now = time.time()
+        conn = self._conn()
+        placeholders = ','.join('?' * len(keys))
+        rows = conn.execute(
+            f'SELECT key, value, expires, accessed FROM cache_entries WHERE key IN ({placeholders})',
+            list(keys)
+        ).fetchall()
+        found, stale = {}, []
+        for key, value, expires, accessed in rows:
+            if expires is not None and expires <= now:
+                continue
+            value = decode(value)
+            if value is MISSING:
+                continue
+            found[key] = value
+            if accessed < now - self.TOUCH_INTERVAL:
+                stale.append(key)
+        if stale:
+            conn.execute(
+                f"UPDATE cache_entries SET accessed = ? WHERE key IN ({','.join('?' * len(stale))})",
+                [now] + stale
+            )
+        return found
+
+    def set(self, key, value, ttl=None):
+        self.set_many({key: value}, ttl)
+
+    def set_many(self, mapping, ttl=None):
+        if not mapping:
+            return
+        now = time.time()
+        expires = now + ttl if ttl else None
+        conn = self._conn()
+        conn.executemany(
+            'INSERT OR REPLACE INTO cache_entries (key, value, expires, accessed) VALUES (?, ?, ?, ?)',
+            [(key, encode(value), expires, now) for key, value in mapping.items()]
+        )
+        self._sets += len(mapping)
+        if self._sets >= self.PRUNE_EVERY:
+            self._sets = 0
+            self._prune(conn, now)
+
+    def _prune(self, conn, now):
+        conn.execute('DELETE FROM cache_entries WHERE expires IS NOT NULL AND expires <= ?', (now,))
+        (count,) = conn.execute('SELECT COUNT(*) FROM cache_entries').fetchone()
+        if count > self.max_entries:
+            conn.execute(
+                'DELETE FROM cache_entries WHERE key IN '
+                '(SELECT key FROM cache_entries ORDER BY accessed LIMIT ?)',
+                (count - self.max_entries,)
+            )
+
+    def add(self, key, value, ttl=None):
+        now = time.time()
+        conn = self._conn()
+        conn.execute('DELETE FROM cache_entries WHERE key = ? AND expires <= ?', (key, now))
+        cursor = conn.execute(
+            'INSERT OR IGNORE INTO cache_entries (key, value, expires, accessed) VALUES (?, ?, ?, ?)',
+            (key, encode(value), now + ttl if ttl else None, now)
+        )
+        return cursor.rowcount == 1
+
+    def delete(self, *keys):
+        if keys:
+            self._conn().execute(
+                f"DELETE FROM cache_entries WHERE key IN ({','.join('?' * len(keys))})", list(keys)
+            )
+
+    def get_generations(self, names):
+        if not names:
+            return {}
+        rows = self._conn().execute(
+            f"SELECT name, value FROM cache_generations WHERE name IN ({','.join('?' * len(names))})",
+            list(names)
+        ).fetchall()
+        found = dict(rows)
+        return {name: found.get(name, 0) for name in names}
+
+    def bump_generation(self, name):
+        self._conn().execute(
+            'INSERT INTO cache_generations (name, value) VALUES (?, 1) '
+            'ON CONFLICT(name) DO UPDATE SET value = value + 1',
+            (name,)
+        )
+
+    def clear(self):
+        conn = self._conn()
+        conn.execute('DELETE FROM cache_entries')
+        conn.execute('DELETE FROM cache_generations')
+
+class RedisBackend:
+    """Cache on a Redis-compatible server; LRU eviction is the server's maxmemory policy"""
+    shared = True
+
+    def __init__(self, url, prefix='prok:'):
+        if redis is None:
+            raise RuntimeError('CACHE_BACKEND=redis requires the redis package')
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        return MISSING if value is None else decode(value)
+
+    def get_many(self, keys):
+        if not keys:
+            return {}
+        values = self.client.mget([self.prefix + key for key in keys])
+        found = {key: decode(value) for key, value in zip(keys, values) if value is not None}
+        return {key: value for key, value in found.items() if value is not MISSING}
+
+    def set(self, key, value, ttl=None):
+        self.client.set(self.prefix + key, encode(value), ex=ttl or None)
+
+    def set_many(self, mapping, ttl=None):
+        pipe = self.client.pipeline(transaction=False)
+        for key, value in mapping.items():
+            pipe.set(self.prefix + key, encode(value), ex=ttl or None)
+        pipe.execute()
+
+    def add(self, key, value, ttl=None):
+        return bool(self.client.set(self.prefix + key, encode(value), ex=ttl or None, nx=True))
+
+    def delete(self, *keys):
+        if keys:
+            self.client.delete(*[self.prefix + key for key in keys])
+
+    def get_generations(self, names):
+        if not names:
+            return {}
+        values = self.client.mget([f'{self.prefix}gen:{name}' for name in names])
+        return {name: int(value or 0) for name, value in zip(names, values)}
+
+    def bump_generation(self, name):
+        self.client.incr(f'{self.prefix}gen:{name}')
+
+    def clear(self):
+        for key in self.client.scan_iter(f'{self.prefix}*'):
+            self.client.delete(key)
+
+class _Flight:
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = MISSING
+
+class Cache:
+    """Facade used by the API; configure with ``init_app``"""
+
+    def __init__(self):
+        self.backend = MemoryBackend()
+        self.default_ttl = 300
+        self.lock_timeout = 5
+        self._flights = {}
+        self._flights_lock = threading.Lock()
+        self._listening = False
+
+    def init_app(self, app):
+        kind = app.config.get('CACHE_BACKEND', 'memory')
+        max_entries = app.config.get('CACHE_MAX_ENTRIES', 2048)
+        if kind == 'sqlite':
+            path = app.config.get('CACHE_URL') or os.path.join(app.instance_path, 'cache.sqlite3')
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self.backend = SQLiteBackend(path, max_entries)
+        elif kind == 'redis':
+            self.backend = RedisBackend(app.config['CACHE_URL'])
+        else:
+            self.backend = MemoryBackend(max_entries)
+        self.default_ttl = app.config.get('CACHE_DEFAULT_TTL', 300)
+        self.lock_timeout = app.config.get('CACHE_LOCK_TIMEOUT', 5)
+        app.extensions['cache'] = self
+
+    def _key(self, key, tags):
+        if not tags:
+            return key
+        generations = self.backend.get_generations(list(tags))
+        return key + '|' + ','.join(f'{tag}={generations[tag]}' for tag in tags)
+
+    def get(self, key, tags=()):
+        value = self.backend.get(self._key(key, tags))
+        return None if value is MISSING else value
+
+    def set(self, key, value, ttl=None, tags=()):
+        self.backend.set(self._key(key, tags), value, ttl or self.default_ttl)
+
+    def get_many(self, keys, tags=()):
+        """Return ``{key: value}`` for the keys that are cached"""
+        full_keys = {self._key(key, tags): key for key in keys}
+        return {full_keys[k]: v for k, v in self.backend.get_many(list(full_keys)).items()}
+
+    def set_many(self, mapping, ttl=None, tags=()):
+        self.backend.set_many(
+            {self._key(key, tags): value for key, value in mapping.items()}, ttl or self.default_ttl
+        )
+
+    def get_or_set_many(self, keys, compute_missing, ttl=None, tags_for=None):
+        """Batch ``get_or_set``: one backend read for every key, then one
+        ``compute_missing(missing_keys) -> {key: value}`` call for the misses.
+
+        ``tags_for(key)`` gives each key its own invalidation tags; the
+        generations of all of them are fetched in a single round trip.
+        """
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+        key_tags = {key: tuple(tags_for(key)) if tags_for else () for key in keys}
+        generations = self.backend.get_generations(list({tag for tags in key_tags.values() for tag in tags}))
+        full_keys = {
+            key: key + '|' + ','.join(f'{tag}={generations[tag]}' for tag in tags) if tags else key
+            for key, tags in key_tags.items()
+        }
+
+        cached = self.backend.get_many(list(full_keys.values()))
+        found = {key: cached[full_keys[key]] for key in keys if full_keys[key] in cached}
+        missing = [key for key in keys if key not in found]
+        if missing:
+            computed = compute_missing(missing)
+            if computed:
+                self.backend.set_many(
+                    {full_keys[key]: value for key, value in computed.items()}, ttl or self.default_ttl
+                )
+                found.update(computed)
+        return found
+
+    def delete(self, *keys):
+        self.backend.delete(*keys)
+
+    def invalidate(self, *tags):
+        """Retire every entry stored under any of ``tags``"""
+        for tag in set(tags):
+            self.backend.bump_generation(tag)
+
+    def get_or_set(self, key, compute, ttl=None, tags=()):
+        """Return the cached value or compute it once.
+
+        Concurrent misses in this process wait for a single computation; with
+        a shared backend a short lock entry extends that across workers.
+        """
+        full_key = self._key(key, tags)
+        value = self.backend.get(full_key)
+        if value is not MISSING:
+            return value
+
+        with self._flights_lock:
+            flight = self._flights.get(full_key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[full_key] = _Flight()
+        if not leader:
+            flight.event.wait(self.lock_timeout)
+            if flight.value is not MISSING:
+                return flight.value
+            return compute()
+
+        try:
+            flight.value = self._compute_shared(full_key, compute, ttl or self.default_ttl)
+            return flight.value
+        finally:
+            flight.event.set()
+            with self._flights_lock:
+                self._flights.pop(full_key, None)
+
+    def _compute_shared(self, full_key, compute, ttl):
+        lock_key = 'lock:' + full_key
+        if self.backend.shared and not self.backend.add(lock_key, 1, self.lock_timeout):
+            # Another worker is computing; wait for its result before giving up
+            deadline = time.time() + self.lock_timeout
+            while time.time() < deadline:
+                time.sleep(0.05)
+                value = self.backend.get(full_key)
+                if value is not MISSING:
+                    return value
+        try:
+            value = compute()
+            self.backend.set(full_key, value, ttl)
+            return value
+        finally:
+            if self.backend.shared:
+                self.backend.delete(lock_key)
+
+    def watch(self, model, tags_for):
+        """Invalidate ``tags_for(target, connection)`` after commits that write ``model``"""
+        def collect(mapper, connection, target):
+            session = object_session(target)
+            if session is not None:
+                session.info.setdefault('cache_tags', set()).update(tags_for(target, connection))
+        for name in ('after_insert', 'after_update', 'after_delete'):
+            event.listen(model, name, collect)
+        if not self._listening:
+            event.listen(Session, 'after_commit', self._after_commit)
+            event.listen(Session, 'after_soft_rollback', self._after_rollback)
+            self._listening = True
+
+    def _after_commit(self, session):
+        tags = session.info.pop('cache_tags', None)
+        if tags:
+            self.invalidate(*tags)
+
+    def _after_rollback(self, session, previous_transaction):
+        session.info.pop('cache_tags', None)
+
+    def clear(self):
+        self.backend.clear()
@@ -0,0 +1,161 @@
+"""Negotiated gzip/brotli response compression.
+
+Responses are compressed after the view runs when the client accepts an
+encoding, the body is at least ``COMPRESS_MIN_SIZE`` bytes and its mimetype
+is compressible. Streamed bodies are compressed incrementally, chunk by
+chunk, whatever their size. Media under the upload paths is already
+compressed (JPEG, PNG, MP4, ...) and is always passed through untouched, as
+are file and partial responses. Brotli is used when the optional ``brotli``
+package is installed and the client prefers it.
+
+Strong ETags are suffixed per encoding (``"abc-gzip"``), so each encoded
+representation keeps a distinct validator; ``strip_encoding_suffix`` maps a
+client's If-None-Match back to the identity ETag.
+"""
+from collections import defaultdict
+import gzip
+import threading
+import zlib
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # optional dependency, gzip is always available
+    brotli = None
+
+DEFAULT_MIMETYPES = (
+    'application/json',
+    'text/html',
+    'text/plain',
+    'text/css',
+    'text/javascript',
+    'application/javascript',
+    'image/svg+xml',
+)
+DEFAULT_EXCLUDE_PATHS = ('/api/uploads/', '/static/uploads/')
+ENCODING_SUFFIXES = ('-br', '-gzip')
+
+def strip_encoding_suffix(etag):
+    for suffix in ENCODING_SUFFIXES:
+        if etag.endswith(suffix):
+            return etag[:-len(suffix)]
+    return etag
+
+class Compress:
+    def __init__(self, app=None):
+        self.stats = defaultdict(lambda: {'responses': 0, 'compressed': 0, 'bytes_in': 0, 'bytes_out': 0})
+        self._stats_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.min_size = app.config.get('COMPRESS_MIN_SIZE', 1024)
+        self.gzip_level = app.config.get('COMPRESS_LEVEL', 6)
+        self.brotli_level = app.config.get('COMPRESS_BR_LEVEL', 5)
+        self.mimetypes = set(app.config.get('COMPRESS_MIMETYPES', DEFAULT_MIMETYPES))
+        self.exclude_paths = tuple(app.config.get('COMPRESS_EXCLUDE_PATHS', DEFAULT_EXCLUDE_PATHS))
+        app.after_request(self.after_request)
+        app.extensions['compress'] = self
+
+    def choose_encoding(self):
+        accept = request.accept_encodings
+        if brotli is not None and accept['br'] and accept['br'] >= accept['gzip']:
+            return 'br'
+        if accept['gzip']:
+            return 'gzip'
+        return None
+
+    def _skip(self, response):
+        return (
+            request.method == 'HEAD'
+            or response.status_code < 200
+            or response.status_code in (204, 206, 304)
+            or response.direct_passthrough
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in self.mimetypes
+            or request.path.startswith(self.exclude_paths)
+        )
+
+    def compress(self, data, encoding):
+        if encoding == 'br':
+            return brotli.compress(data, quality=self.brotli_level)
+        return gzip.compress(data, compresslevel=self.gzip_level, mtime=0)
+
+    def after_request(self, response):
+        if self._skip(response):
+            return response
+        response.vary.add('Accept-Encoding')
+        if response.is_streamed:
+            return self._compress_stream(response)
+        data = response.get_data()
+        encoding = self.choose_encoding() if len(data) >= self.min_size else None
+        if encoding is None:
+            self._record(len(data), len(data), False)
+            return response
+
+        compressed = self.compress(data, encoding)
+        response.set_data(compressed)
+        self._mark_encoded(response, encoding)
+        self._record(len(data), len(compressed), True)
+        return response
+
+    def _mark_encoded(self, response, encoding):
+        response.headers['Content-Encoding'] = encoding
+        etag, weak = response.get_etag()
+        if etag:
+            response.set_etag(f'{etag}-{encoding}', weak)
+
+    def _compressor(self, encoding):
+        if encoding == 'br':
+            compressor = brotli.Compressor(quality=self.brotli_level)
+            return compressor.process, compressor.finish
+        compressor = zlib.compressobj(self.gzip_level, zlib.DEFLATED, 31)
+        return compressor.compress, compressor.flush
+
+    def _compress_stream(self, response):
+        encoding = self.choose_encoding()
+        if encoding is None:
+            return response
+        process, finish = self._compressor(encoding)
+        chunks = response.response
+        endpoint = request.endpoint or request.path
+
+        def generate():
+            bytes_in = bytes_out = 0
+            try:
+                for chunk in chunks:
+                    bytes_in += len(chunk)
+                    out = process(chunk)
+                    if out:
+                        bytes_out += len(out)
+                        yield out
+                out = finish()
+                bytes_out += len(out)
+                yield out
+            finally:
+                if hasattr(chunks, 'close'):
+                    chunks.close()
+            self._record(bytes_in, bytes_out, True, endpoint)
+
+        response.response = generate()
+        response.headers.pop('Content-Length', None)
+        self._mark_encoded(response, encoding)
+        return response
+
+    def _record(self, bytes_in, bytes_out, compressed, endpoint=None):
+        endpoint = endpoint or request.endpoint or request.path
+        with self._stats_lock:
+            stats = self.stats[endpoint]
+            stats['responses'] += 1
+            stats['compressed'] += int(compressed)
+            stats['bytes_in'] += bytes_in
+            stats['bytes_out'] += bytes_out
+
+    def snapshot(self):
+        """Per-endpoint byte counts and savings for this worker"""
+        with self._stats_lock:
+            return {
+                endpoint: dict(stats, saved_bytes=stats['bytes_in'] - stats['bytes_out'],
+                               ratio=round(stats['bytes_out'] / stats['bytes_in'], 3) if stats['bytes_in'] else None)
+                for endpoint, stats in self.stats.items()
+            }
@@ -0,0 +1,49 @@
+"""Conditional GET helpers: strong ETags, Cache-Control and 304 short-circuits.
+
+Handlers compute an ETag from cheap inputs (version columns, ids and counters
+of the rows being returned) *before* serializing anything, and only build the
+JSON body when the client's ``If-None-Match`` does not already match.
+"""
+import hashlib
+from flask import request, jsonify, make_response
+from services.compression import strip_encoding_suffix
+from services.json_provider import stream_json
+
+PRIVATE_REVALIDATE = 'private, no-cache'
+PUBLIC_REVALIDATE = 'public, no-cache'
+
+def make_etag(*parts):
+    """Hash arbitrary (repr-stable) values into a strong ETag value"""
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update(repr(part).encode())
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+def is_fresh(etag):
+    """True when the client already holds the representation tagged ``etag``.
+
+    Also matches the ``-gzip``/``-br`` variants the compression layer sends.
+    """
+    if_none_match = request.if_none_match
+    if if_none_match.star_tag or if_none_match.contains(etag):
+        return True
+    return any(strip_encoding_suffix(tag) == etag for tag in if_none_match.as_set())
+
+def conditional_json(etag, build_body, cache_control=PUBLIC_REVALIDATE, status=200, vary=None, stream_key=None):
+    """Return 304 if ``etag`` matches, else jsonify ``build_body()``; both carry the validators.
+
+    With ``stream_key`` the list under that key is streamed item by item.
+    """
+    if is_fresh(etag):
+        response = make_response('', 304)
+    elif stream_key:
+        body = build_body()
+        response = stream_json(body, stream_key, body.pop(stream_key), status)
+    else:
+        response = make_response(jsonify(build_body()), status)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = cache_control
+    if vary:
+        response.vary.add(vary)
+    return response
@@ -0,0 +1,85 @@
+"""Cached identity of the authenticated user.
+
+Registered as Flask-JWT-Extended's ``user_lookup_loader``, so every
+``@jwt_required()`` request gets ``current_user`` (an ``Identity`` tuple:
+id, username, email, profile_id) without loading the User row. The
+extension keeps the loaded identity on ``g`` for the rest of the request;
+across requests identities live in a per-process LRU
+(``IDENTITY_CACHE_SIZE`` entries, ``IDENTITY_CACHE_TTL`` seconds).
+
+Each entry remembers the generation of the ``user:{id}`` cache tag it was
+loaded under. Commits that write the user or their profile bump that tag
+(see the ``cache.watch`` registrations in ``api/profile.py``), so a stale
+entry is refused at once in this worker, and in every worker when the cache
+backend is shared; the TTL bounds staleness otherwise. A token whose user no
+longer exists gets 401.
+
+``token_claims(user)`` gives the minimal claims embedded in access tokens
+(the username), so clients can show who is signed in without a request.
+"""
+from collections import OrderedDict, namedtuple
+import threading
+import time
+from flask import jsonify
+from extensions import db, cache
+from models.user import User
+from models.profile import Profile
+
+Identity = namedtuple('Identity', ['id', 'username', 'email', 'profile_id'])
+
+class IdentityCache:
+    def __init__(self, max_entries=4096, ttl=30):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # user id -> (identity, generation, expires)
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.max_entries = app.config.get('IDENTITY_CACHE_SIZE', self.max_entries)
+        self.ttl = app.config.get('IDENTITY_CACHE_TTL', self.ttl)
+        jwt = app.extensions['flask-jwt-extended']
+        jwt.user_lookup_loader(lambda jwt_header, jwt_data: self.lookup(jwt_data['sub']))
+        jwt.user_lookup_error_loader(
+            lambda jwt_header, jwt_data: (jsonify(success=False, message='User not found'), 401)
+        )
+        app.extensions['identity_cache'] = self
+
+    def lookup(self, subject):
+        # Only numeric subjects name a user (the legacy /register stub signs emails)
+        return self.get(int(subject)) if str(subject).isdigit() else None
+
+    def get(self, user_id):
+        """The user's ``Identity``, or None if the user does not exist"""
+        tag = f'user:{user_id}'
+        generation = cache.backend.get_generations([tag])[tag]
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[1] == generation and entry[2] > time.time():
+                self._entries.move_to_end(user_id)
+                return entry[0]
+        # Loaded after reading the generation, so a concurrent write can only
+        # make this entry look older than it is, never newer
+        identity = self._load(user_id)
+        if identity is not None:
+            with self._lock:
+                self._entries[user_id] = (identity, generation, time.time() + self.ttl)
+                self._entries.move_to_end(user_id)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return identity
+
+    def _load(self, user_id):
+        row = db.session.query(User.id, User.username, User.email, Profile.id).outerjoin(
+            Profile, Profile.user_id == User.id
+        ).filter(User.id == user_id).first()
+        return Identity(*row) if row else None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+identity_cache = IdentityCache()
+
+def token_claims(user):
+    """Extra claims for ``create_access_token(additional_claims=...)``"""
+    return {'username': user.username}
@@ -0,0 +1,205 @@
+"""Background image processing for avatar, banner and post image uploads.
+
+Upload requests only spool the file to disk and return 202 with an
+``ImageJob`` id. Decoding and encoding the thumb/card/full variants
+(JPEG + WebP, see ``services.image_ops``) happen in a small process pool
+(``IMAGE_WORKERS`` processes per gunicorn worker), so large PNGs never hold
+a request thread or the GIL. At most ``IMAGE_QUEUE_SIZE`` images may be
+queued or running per worker; past that ``submit`` raises ``QueueFull`` and
+the API answers 503 with Retry-After. If a child process dies, the jobs it
+took down fail and the pool is rebuilt on the next submit.
+
+When a job finishes, a completion callback in the web process moves the
+variants into the media store, records their URLs on the profile or post and
+marks the job done (or failed).
+"""
+import atexit
+import multiprocessing
+import os
+import shutil
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from services.image_ops import process_variants, DEFAULT_VARIANT
+from services.media_store import upload_root, store_file, url_for_key
+
+class QueueFull(Exception):
+    """Raised by ``submit`` when the processing queue is at capacity"""
+
+class ImageProcessor:
+    def __init__(self):
+        self.app = None
+        self.workers = 2
+        self.queue_size = 16
+        self._executor = None
+        self._slots = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+        self.workers = app.config.get('IMAGE_WORKERS', 2)
+        self.queue_size = app.config.get('IMAGE_QUEUE_SIZE', 16)
+        app.extensions['image_processor'] = self
+        atexit.register(self.shutdown)
+
+    def _pool(self):
+        # Pools do not survive fork, so each gunicorn worker starts its own;
+        # spawned children only import Pillow and services.image_ops
+        if self._executor is not None and self._pid == os.getpid():
+            return self._executor
+        with self._lock:
+            if self._pid != os.getpid():
+                self._executor = None
+                self._slots = threading.BoundedSemaphore(self.queue_size)
+                self._pid = os.getpid()
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context('spawn')
+                )
+        return self._executor
+
+    def _discard(self, executor):
+        """Drop a pool whose child died (OOM kill, decoder crash); the next call builds a new one"""
+        with self._lock:
+            if self._executor is not executor:
+                return
+            self._executor = None
+        print('[IMAGES] Worker process died, restarting the image pool')
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def submit(self, fn, *args, on_done):
+        """Run ``fn(*args)`` in the pool, then ``on_done(result, error)`` in this process"""
+        executor = self._pool()
+        slots = self._slots
+        if not slots.acquire(blocking=False):
+            raise QueueFull()
+        try:
+            try:
+                future = executor.submit(fn, *args)
+            except BrokenProcessPool:
+                # Broken by an earlier crash; retry once on a fresh pool
+                self._discard(executor)
+                executor = self._pool()
+                future = executor.submit(fn, *args)
+        except Exception:
+            slots.release()
+            raise
+        future.add_done_callback(lambda done: self._finish(done, on_done, executor, slots))
+        return future
+
+    def _finish(self, future, on_done, executor, slots):
+        try:
+            error = None if future.cancelled() else future.exception()
+            if future.cancelled() or isinstance(error, BrokenProcessPool):
+                self._discard(executor)
+                error = error or BrokenProcessPool('The image pool was restarted.')
+            on_done(None if error else future.result(), error)
+        except Exception as e:
+            print(f'[IMAGES] Completion handler failed: {e}')
+        finally:
+            slots.release()
+
+    def shutdown(self):
+        if self._executor is not None and self._pid == os.getpid():
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+image_processor = ImageProcessor()
+
+def _remove(*paths):
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+def _apply_variants(job, variants):
+    """Point the job's target (profile avatar/banner or post media) at its variants"""
+    from extensions import db
+    from models.post import Post
+    from models.profile import Profile
+
+    if job.kind == 'post':
+        post = db.session.get(Post, job.post_id)
+        if post:
+            post.media_variants = variants
+        return
+    profile = Profile.query.filter_by(user_id=job.user_id).first()
+    if not profile:
+        profile = Profile(user_id=job.user_id)
+        db.session.add(profile)
+    setattr(profile, job.kind, variants[DEFAULT_VARIANT]['jpeg'])
+    setattr(profile, f'{job.kind}_variants', variants)
+    profile.touch()
+
+def _store_variants(result, work_dir):
+    """Move the worker's variant files into the media store; returns the variant map with URLs"""
+    return {
+        name: dict(
+            variant,
+            jpeg=url_for_key(store_file(os.path.join(work_dir, variant['jpeg']), 'jpg')),
+            webp=url_for_key(store_file(os.path.join(work_dir, variant['webp']), 'webp'))
+        )
+        for name, variant in result.items()
+    }
+
+def _complete(job_id, source_path, keep_source, work_dir, result, error):
+    from extensions import db
+    from models.media import ImageJob
+
+    if not keep_source:
+        _remove(source_path)
+    with image_processor.app.app_context():
+        try:
+            job = db.session.get(ImageJob, job_id)
+            if error is None:
+                variants = _store_variants(result, work_dir)
+                if job:
+                    _apply_variants(job, variants)
+                    job.status, job.url = 'done', variants[DEFAULT_VARIANT]['jpeg']
+                print(f'[IMAGES] Job {job_id} ready: {len(variants)} variants')
+            else:
+                if job:
+                    job.status, job.error = 'failed', 'The image could not be processed.'
+                print(f'[IMAGES] Job {job_id} failed: {error}')
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+            db.session.remove()
+
+def enqueue_image(job, source_path, keep_source=False):
+    """Queue variant generation for ``job`` (a committed ImageJob).
+
+    The worker writes variants into a per-job work directory; on completion
+    they are moved into the content-addressed media store. The source is
+    deleted afterwards unless ``keep_source``. Raises ``QueueFull``, or the
+    pool's error if the job could not be submitted at all.
+    """
+    job_id, kind = job.id, job.kind
+    work_dir = os.path.join(upload_root(), 'tmp', job_id)
+    os.makedirs(work_dir, exist_ok=True)
+
+    def on_done(result, error):
+        _complete(job_id, source_path, keep_source, work_dir, result, error)
+
+    try:
+        image_processor.submit(process_variants, source_path, work_dir, kind, kind, on_done=on_done)
+    except Exception:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        raise
+
+def enqueue_profile_image(job, file):
+    """Queue an avatar/banner upload (already on disk, see services.ingest) for ``job``.
+
+    Raises ``QueueFull`` after removing the uploaded file.
+    """
+    spool_path = file.stream.detach()
+    try:
+        enqueue_image(job, spool_path)
+    except Exception:
+        _remove(spool_path)
+        raise
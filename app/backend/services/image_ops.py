@@ -0,0 +1,38 @@
+"""Pillow work for uploaded images.
+
+Everything here runs inside the image worker processes, so the module only
+imports Pillow and takes/returns plain paths and dicts.
+"""
+from PIL import Image, ImageOps
+
+JPEG_QUALITY = 85
+WEBP_QUALITY = 80
+
+# Bounding boxes per upload kind, largest first; images are only ever shrunk
+VARIANT_SIZES = {
+    'avatar': {'full': (512, 512), 'card': (256, 256), 'thumb': (64, 64)},
+    'banner': {'full': (3000, 1000), 'card': (1500, 500), 'thumb': (600, 200)},
+    'post': {'full': (1600, 1600), 'card': (800, 800), 'thumb': (320, 320)},
+}
+VARIANT_NAMES = ('thumb', 'card', 'full')
+DEFAULT_VARIANT = 'card'
+
+def process_variants(source_path, dest_dir, stem, kind):
+    """Decode ``source_path`` once and write every ``kind`` variant as JPEG and WebP.
+
+    JPEGs are progressive. Only pixels are written back, so EXIF (GPS,
+    camera), XMP and ICC metadata are dropped; the EXIF orientation is
+    applied first. Each variant is resampled from the previous, larger one.
+    Returns ``{variant: {'jpeg': filename, 'webp': filename, 'width', 'height'}}``.
+    """
+    variants = {}
+    with Image.open(source_path) as original:
+        img = ImageOps.exif_transpose(original).convert('RGB')
+    for name, box in VARIANT_SIZES[kind].items():
+        img = img.copy()
+        img.thumbnail(box)
+        jpeg, webp = f'{stem}_{name}.jpg', f'{stem}_{name}.webp'
+        img.save(f'{dest_dir}/{jpeg}', format='JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+        img.save(f'{dest_dir}/{webp}', format='WEBP', quality=WEBP_QUALITY, method=4)
+        variants[name] = {'jpeg': jpeg, 'webp': webp, 'width': img.width, 'height': img.height}
+    return variants
@@ -0,0 +1,231 @@
+"""Streaming ingestion for upload endpoints.
+
+Upload routes are marked with ``@ingest(max_bytes, formats)``. For those
+routes ``IngestRequest`` (the app's request class):
+
+- caps the whole request body at the route's limit instead of the global
+  ``MAX_CONTENT_LENGTH``, so an oversized Content-Length is refused with 413
+  before anything is read;
+- streams each multipart file into an ``IngestFile`` rather than a spooled
+  temp file. While the parser writes, the file counts bytes against
+  ``max_bytes``, sniffs the format from its magic bytes, reads image
+  dimensions from the header with Pillow (within the first ``HEADER_LIMIT``
+  bytes) and hashes the content for the media store. A wrong type, an image
+  over ``UPLOAD_MAX_IMAGE_PIXELS`` (a decompression bomb) or too many bytes
+  stops the parse right there, so the rest of the body is never buffered.
+
+Views then call ``upload.stream.store()`` to move the file into the media
+store with the hash computed on the way in, or ``detach()`` to take the temp
+file over (e.g. as the source of an image job). Raw-body uploads (upload
+session chunks) only get the route size limit and use ``Sniffer`` directly.
+"""
+from collections import namedtuple
+from functools import wraps
+import hashlib
+import io
+import os
+import tempfile
+from flask import Request, current_app, jsonify, request
+from PIL import Image
+from werkzeug.exceptions import RequestEntityTooLarge
+from services.media_store import upload_root, store_file
+
+IMAGE_FORMATS = ('png', 'jpg')
+VIDEO_FORMATS = ('mp4', 'mov', 'webm')
+PILLOW_FORMATS = {'png': 'PNG', 'jpg': 'JPEG'}
+
+HEADER_LIMIT = 64 * 1024  # JPEG EXIF segments may push the frame header this far
+FIRST_HEADER_TRY = 2048
+FORM_OVERHEAD = 64 * 1024  # multipart boundaries and small form fields
+DEFAULT_MAX_IMAGE_PIXELS = 40_000_000
+
+Sniffed = namedtuple('Sniffed', ['ext', 'kind', 'width', 'height'])
+IngestSpec = namedtuple('IngestSpec', ['max_bytes', 'formats'])
+
+class UploadRejected(Exception):
+    """Raised while an upload streams in; ``status`` is the HTTP status to answer with"""
+
+    def __init__(self, message, status=415):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+def detect_format(head):
+    """Format (as a file extension) from the leading bytes, or None"""
+    if head.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'png'
+    if head.startswith(b'\xff\xd8\xff'):
+        return 'jpg'
+    if head.startswith(b'\x1a\x45\xdf\xa3'):
+        return 'webm'
+    if head[4:8] == b'ftyp':
+        return 'mov' if head[8:12] == b'qt  ' else 'mp4'
+    return None
+
+def _size_limit_message(max_bytes):
+    return f'File exceeds the {max_bytes / (1024 * 1024):g}MB limit.'
+
+class Sniffer:
+    """Decide an upload's format (and image size) from its first bytes.
+
+    ``feed`` returns the ``Sniffed`` result once it is known and raises
+    ``UploadRejected`` as soon as the upload can be refused; ``finish`` forces
+    a decision at the end of the data.
+    """
+
+    def __init__(self, formats, max_pixels=None):
+        self.formats = formats
+        self.max_pixels = max_pixels or current_app.config.get('UPLOAD_MAX_IMAGE_PIXELS', DEFAULT_MAX_IMAGE_PIXELS)
+        self.head = bytearray()
+        self.result = None
+        self._next_try = FIRST_HEADER_TRY
+
+    def feed(self, data):
+        if self.result is None:
+            self.head += data[:HEADER_LIMIT - len(self.head)]
+            if len(self.head) >= min(self._next_try, HEADER_LIMIT):
+                self._decide(final=len(self.head) >= HEADER_LIMIT)
+        return self.result
+
+    def finish(self):
+        if self.result is None:
+            self._decide(final=True)
+        return self.result
+
+    def _decide(self, final):
+        ext = detect_format(self.head)
+        if ext is None or ext not in self.formats:
+            raise UploadRejected(f"Unsupported file type. Allowed: {', '.join(self.formats)}.")
+        if ext not in PILLOW_FORMATS:
+            self.result = Sniffed(ext, 'video', None, None)
+            return
+        try:
+            with Image.open(io.BytesIO(self.head), formats=[PILLOW_FORMATS[ext]]) as img:
+                width, height = img.size
+        except Image.DecompressionBombError:
+            raise UploadRejected('Image dimensions are too large.', 413)
+        except Exception:
+            # The header continues past what has arrived so far
+            if final:
+                raise UploadRejected('The image could not be read.')
+            self._next_try *= 2
+            return
+        if width * height > self.max_pixels:
+            raise UploadRejected('Image dimensions are too large.', 413)
+        self.result = Sniffed(ext, 'image', width, height)
+
+class IngestFile:
+    """Write target for one multipart file: limits, sniffs and hashes as it is written"""
+
+    def __init__(self, spec):
+        self.spec = spec
+        temp_dir = os.path.join(upload_root(), 'tmp')
+        os.makedirs(temp_dir, exist_ok=True)
+        fd, self.path = tempfile.mkstemp(dir=temp_dir, suffix='.upload')
+        self._file = os.fdopen(fd, 'w+b')
+        self._digest = hashlib.blake2b(digest_size=32)
+        self._sniffer = Sniffer(spec.formats)
+        self.size = 0
+
+    def write(self, data):
+        self.size += len(data)
+        if self.size > self.spec.max_bytes:
+            raise UploadRejected(_size_limit_message(self.spec.max_bytes), 413)
+        self._sniffer.feed(data)
+        self._digest.update(data)
+        return self._file.write(data)
+
+    def finish(self):
+        """Decide the format of a file shorter than the header window"""
+        return self._sniffer.finish()
+
+    @property
+    def sniffed(self):
+        return self._sniffer.result
+
+    @property
+    def kind(self):
+        return self.sniffed.kind
+
+    @property
+    def ext(self):
+        return self.sniffed.ext
+
+    def store(self):
+        """Move the file into the media store; returns its key"""
+        self._file.close()
+        path, self.path = self.path, None
+        return store_file(path, self.ext, digest=self._digest.hexdigest())
+
+    def detach(self):
+        """Hand the temp file over to the caller; returns its path"""
+        self._file.close()
+        path, self.path = self.path, None
+        return path
+
+    def close(self):
+        self._file.close()
+        if self.path:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+            self.path = None
+
+    def __getattr__(self, name):
+        # read/seek/tell etc. for FileStorage
+        return getattr(self._file, name)
+
+def ingest(max_bytes, formats=None):
+    """Route decorator: limit the request body to ``max_bytes`` and, with
+    ``formats``, stream multipart files through ``IngestFile``.
+
+    Place it below ``@jwt_required()`` so unauthenticated bodies are never read.
+    Rejections are answered with the repo's JSON error shape.
+    """
+    spec = IngestSpec(max_bytes, tuple(formats) if formats else None)
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if spec.formats and request.mimetype == 'multipart/form-data':
+                try:
+                    for _, upload in request.files.items(multi=True):
+                        upload.stream.finish()
+                except UploadRejected as e:
+                    print(f'[INGEST] Rejected upload to {request.path}: {e.message}')
+                    return jsonify(success=False, message=e.message), e.status
+                except RequestEntityTooLarge:
+                    return jsonify(success=False, message=_size_limit_message(max_bytes)), 413
+            return view(*args, **kwargs)
+        wrapper.ingest_spec = spec
+        return wrapper
+    return decorator
+
+class IngestRequest(Request):
+    """Applies the matched view's ``@ingest`` spec to body limits and file streams"""
+
+    def _ingest_spec(self):
+        view = current_app.view_functions.get(self.endpoint) if self.endpoint else None
+        return getattr(view, 'ingest_spec', None)
+
+    @property
+    def max_content_length(self):
+        spec = self._ingest_spec()
+        if spec is None:
+            return super().max_content_length
+        return spec.max_bytes + FORM_OVERHEAD if spec.formats else spec.max_bytes
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        spec = self._ingest_spec()
+        if spec is None or not spec.formats:
+            return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+        upload = IngestFile(spec)
+        # Tracked here too: a file rejected mid-parse never reaches request.files
+        self.__dict__.setdefault('_ingest_files', []).append(upload)
+        return upload
+
+    def close(self):
+        for upload in self.__dict__.get('_ingest_files', ()):
+            upload.close()
+        super().close()
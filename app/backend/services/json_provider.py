@@ -0,0 +1,74 @@
+"""Fast JSON provider and streamed list responses.
+
+``FastJSONProvider`` replaces Flask's stdlib encoder with orjson when it is
+installed. Both paths emit dates and datetimes as ISO 8601, so models can put
+``created_at`` straight into their dicts instead of calling ``.isoformat()``.
+
+``stream_json`` writes ``{"posts": [...], ...}`` style responses item by item,
+so a large page is never held in memory as one encoded string.
+"""
+from datetime import date
+import json
+from flask import current_app, stream_with_context
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional dependency, falls back to the stdlib encoder
+    orjson = None
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS if orjson is not None else 0
+
+def _default(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    return DefaultJSONProvider.default(value)
+
+class FastJSONProvider(DefaultJSONProvider):
+    sort_keys = False
+
+    def dumps_bytes(self, obj):
+        if orjson is not None:
+            return orjson.dumps(obj, default=_default, option=ORJSON_OPTIONS)
+        return json.dumps(obj, default=_default, separators=(',', ':')).encode()
+
+    def dumps(self, obj, **kwargs):
+        if orjson is not None and not kwargs:
+            return self.dumps_bytes(obj).decode()
+        kwargs.setdefault('default', _default)
+        return json.dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dumps_bytes(obj), mimetype=self.mimetype)
+
+def _encode(obj):
+    provider = current_app.json
+    if isinstance(provider, FastJSONProvider):
+        return provider.dumps_bytes(obj)
+    return provider.dumps(obj).encode()
+
+def _generate(envelope, key, items):
+    head = _encode(envelope)
+    if head == b'{}':
+        yield b'{"' + key.encode() + b'":['
+    else:
+        yield head[:-1] + b',"' + key.encode() + b'":['
+    first = True
+    for item in items:
+        yield _encode(item) if first else b',' + _encode(item)
+        first = False
+    yield b']}'
+
+def stream_json(envelope, key, items, status=200):
+    """Stream ``envelope`` with ``items`` encoded one by one under ``key``"""
+    return current_app.response_class(
+        stream_with_context(_generate(envelope, key, items)),
+        status=status,
+        mimetype=current_app.json.mimetype
+    )
@@ -0,0 +1,48 @@
+"""Likes backed by post_likes, with counters maintained atomically in SQL"""
+from datetime import datetime
+from sqlalchemy import update, func
+from extensions import db
+from models.post import Post, PostLike
+from services.sql import insert_ignore
+
+def _adjust_likes_count(post_id, delta):
+    # Counter changes are not edits, so keep updated_at as it was
+    db.session.execute(
+        update(Post)
+        .where(Post.id == post_id)
+        .values(likes_count=func.coalesce(Post.likes_count, 0) + delta, updated_at=Post.updated_at)
+        .execution_options(synchronize_session=False)
+    )
+
+def like(user_id, post_id):
+    """Record a like; returns False if the user had already liked the post"""
+    created = insert_ignore(db.session, PostLike.__table__, {
+        'user_id': user_id, 'post_id': post_id, 'created_at': datetime.utcnow()
+    }, ['user_id', 'post_id'])
+    if created:
+        _adjust_likes_count(post_id, 1)
+    return created
+
+def unlike(user_id, post_id):
+    """Remove a like; returns False if there was nothing to remove"""
+    result = db.session.execute(
+        PostLike.__table__.delete().where(PostLike.user_id == user_id, PostLike.post_id == post_id)
+    )
+    removed = result.rowcount == 1
+    if removed:
+        _adjust_likes_count(post_id, -1)
+    return removed
+
+def likes_count(post_id):
+    return db.session.query(Post.likes_count).filter(Post.id == post_id).scalar() or 0
+
+def liked_post_ids(user_id, post_ids):
+    """Return the subset of ``post_ids`` the user has liked, in one query"""
+    post_ids = list(post_ids)
+    if not user_id or not post_ids:
+        return set()
+    rows = db.session.query(PostLike.post_id).filter(
+        PostLike.user_id == user_id,
+        PostLike.post_id.in_(post_ids)
+    ).all()
+    return {post_id for (post_id,) in rows}
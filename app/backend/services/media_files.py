@@ -0,0 +1,64 @@
+"""Sending stored upload files to clients.
+
+Every upload URL (``/api/uploads/...``, legacy ``/static/uploads/...`` and
+the ``/api/media`` variant endpoints) ends in ``send_media``, which serves a
+path relative to the uploads root:
+
+- Content-addressed names (see ``services.media_store``) never change, so
+  they are sent with a one year ``immutable`` Cache-Control; other files get
+  a short max-age plus ETag revalidation.
+- Range requests are answered with 206 partial content, so video players can
+  seek without downloading the whole file.
+- With ``MEDIA_OFFLOAD`` set, the worker only sends headers and the front
+  proxy streams the bytes (and handles Range itself): ``x-accel`` emits
+  ``X-Accel-Redirect: <MEDIA_ACCEL_PREFIX><path>`` for nginx, ``x-sendfile``
+  emits ``X-Sendfile: <absolute path>`` for Apache/lighttpd.
+"""
+import mimetypes
+import os
+from urllib.parse import quote
+from flask import current_app, request, send_file
+from werkzeug.exceptions import NotFound
+from werkzeug.security import safe_join
+from werkzeug.utils import send_file as send_file_offloaded
+from services.media_store import KEY_PATTERN, upload_root
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+IMMUTABLE_CACHE_CONTROL = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+DEFAULT_CACHE_CONTROL = 'public, max-age=300'
+
+def is_immutable(filename):
+    return bool(KEY_PATTERN.match(filename))
+
+def send_media(filename, cache_control=None):
+    """Send ``filename`` (relative to the uploads root); 404 if it does not exist.
+
+    ``cache_control`` overrides the name-based policy, for URLs whose target
+    can change (e.g. "current avatar" endpoints).
+    """
+    path = safe_join(upload_root(), filename)
+    if path is None or not os.path.isfile(path):
+        raise NotFound()
+    immutable = is_immutable(filename)
+    if cache_control is None:
+        cache_control = IMMUTABLE_CACHE_CONTROL if immutable else DEFAULT_CACHE_CONTROL
+
+    offload = current_app.config.get('MEDIA_OFFLOAD')
+    if offload == 'x-accel':
+        # nginx serves the internal location, including Range and conditional requests
+        response = current_app.response_class()
+        response.mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        response.headers['X-Accel-Redirect'] = current_app.config.get('MEDIA_ACCEL_PREFIX', '/internal/uploads/') + quote(filename)
+    elif offload == 'x-sendfile':
+        response = send_file_offloaded(
+            path, request.environ, use_x_sendfile=True, conditional=False,
+            response_class=current_app.response_class
+        )
+    else:
+        # conditional: ETag/Last-Modified revalidation and single byte ranges (206);
+        # a content-addressed name already is the strongest possible ETag
+        etag = os.path.basename(filename).split('.')[0] if immutable else True
+        response = send_file(path, conditional=True, etag=etag)
+        response.accept_ranges = 'bytes'
+    response.headers['Cache-Control'] = cache_control
+    return response
@@ -0,0 +1,216 @@
+"""Content-addressed upload storage.
+
+Every stored file is named after the BLAKE2b-256 hash of its bytes and lives
+in a sharded tree under ``static/uploads`` (``ab/cd/abcd...ef.jpg``), so no
+directory grows past a few hundred entries and identical uploads share one
+file: a re-upload of the same bytes only discards its temp file.
+
+References are counted in ``media_objects``. Mapper events on Post,
+Profile and UploadSession turn every change to a media URL column
+(including the variant JSON maps) into refcount deltas, applied in the same
+flush with one upsert, the same way tag counters are kept. Objects whose count drops to zero are
+deleted by ``collect_garbage`` once their file has been untouched for
+``GC_GRACE`` seconds (storing a file again refreshes its mtime).
+"""
+from collections import Counter
+import hashlib
+import os
+import re
+import tempfile
+import threading
+import time
+from flask import current_app
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session, object_session
+from extensions import db
+from models.media import MediaObject, UploadSession
+from models.post import Post
+from models.profile import Profile
+from services.sql import upsert_counters
+
+MEDIA_URL_PREFIX = '/api/uploads/'
+GC_GRACE = 3600  # seconds
+GC_INTERVAL = 3600
+COPY_CHUNK_SIZE = 64 * 1024
+
+# Columns holding media URLs, either plain strings or variant maps
+MEDIA_COLUMNS = {
+    Post: ('media_url', 'media_variants'),
+    Profile: ('avatar', 'banner', 'avatar_variants', 'banner_variants'),
+    UploadSession: ('media_url',),
+}
+
+KEY_PATTERN = re.compile(r'^([0-9a-f]{2})/([0-9a-f]{2})/\1\2[0-9a-f]{60}\.[a-z0-9]{1,5}$')
+
+_last_gc = 0
+
+def upload_root():
+    return os.path.join(current_app.root_path, 'static', 'uploads')
+
+def key_for_digest(digest, ext):
+    return f'{digest[:2]}/{digest[2:4]}/{digest}.{ext.lower()}'
+
+def url_for_key(key):
+    return MEDIA_URL_PREFIX + key
+
+def key_for_url(url):
+    """The store key behind ``url``, or None for legacy and external URLs"""
+    if not isinstance(url, str) or not url.startswith(MEDIA_URL_PREFIX):
+        return None
+    key = url[len(MEDIA_URL_PREFIX):]
+    return key if KEY_PATTERN.match(key) else None
+
+def _place(temp_path, digest, ext, root):
+    key = key_for_digest(digest, ext)
+    path = os.path.join(root, key)
+    try:
+        # Already stored: skip the write, refresh the mtime so GC leaves it be
+        os.utime(path)
+        os.remove(temp_path)
+    except FileNotFoundError:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(temp_path, path)
+    _ensure_rows([key])
+    return key
+
+def store_stream(stream, ext, root=None):
+    """Hash and write ``stream`` in one pass; returns its store key"""
+    root = root or upload_root()
+    temp_dir = os.path.join(root, 'tmp')
+    os.makedirs(temp_dir, exist_ok=True)
+    digest = hashlib.blake2b(digest_size=32)
+    fd, temp_path = tempfile.mkstemp(dir=temp_dir)
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            for chunk in iter(lambda: stream.read(COPY_CHUNK_SIZE), b''):
+                digest.update(chunk)
+                out.write(chunk)
+        return _place(temp_path, digest.hexdigest(), ext, root)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+def file_digest(path):
+    """BLAKE2b-256 hex digest of the file at ``path``, as used for store keys"""
+    digest = hashlib.blake2b(digest_size=32)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(COPY_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def store_file(path, ext, root=None, digest=None):
+    """Move an already written file (e.g. an image variant) into the store.
+
+    Pass ``digest`` when the caller has already hashed the file.
+    """
+    return _place(path, digest or file_digest(path), ext, root or upload_root())
+
+def path_for_key(key, root=None):
+    return os.path.join(root or upload_root(), key)
+
+def _ensure_rows(keys):
+    # A zero-delta upsert registers new objects, so files whose referencing
+    # row never commits are still found (and reclaimed) by collect_garbage
+    upsert_counters(db.session.connection(), MediaObject.__table__, ['key'], 'refcount', [
+        {'key': key, 'refcount': 0} for key in keys
+    ])
+
+def _urls(value):
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _urls(item)
+
+def _keys(values):
+    return Counter(key for value in values for url in _urls(value) for key in [key_for_url(url)] if key)
+
+def _collect(target, deltas):
+    session = object_session(target)
+    if session is not None and deltas:
+        session.info.setdefault('media_deltas', Counter()).update(deltas)
+
+def _current_keys(target):
+    return _keys(getattr(target, column) for column in MEDIA_COLUMNS[type(target)])
+
+def _inserted(mapper, connection, target):
+    _collect(target, _current_keys(target))
+
+def _updated(mapper, connection, target):
+    state = inspect(target)
+    deltas = Counter()
+    for column in MEDIA_COLUMNS[type(target)]:
+        history = state.attrs[column].history
+        if history.has_changes():
+            deltas.update(_keys(history.added))
+            deltas.subtract(_keys(history.deleted))
+    _collect(target, deltas)
+
+def _deleting(mapper, connection, target):
+    # before_delete: the row (and any expired attributes) can still be loaded
+    _collect(target, {key: -count for key, count in _current_keys(target).items()})
+
+for _model in MEDIA_COLUMNS:
+    event.listen(_model, 'after_insert', _inserted)
+    event.listen(_model, 'after_update', _updated)
+    event.listen(_model, 'before_delete', _deleting)
+
+@event.listens_for(Session, 'after_flush')
+def _apply_media_deltas(session, flush_context):
+    deltas = session.info.pop('media_deltas', None)
+    deltas = {key: delta for key, delta in (deltas or {}).items() if delta}
+    if not deltas:
+        return
+    upsert_counters(session.connection(), MediaObject.__table__, ['key'], 'refcount', [
+        {'key': key, 'refcount': delta} for key, delta in deltas.items()
+    ])
+    if any(delta < 0 for delta in deltas.values()):
+        session.info['media_released'] = True
+
+@event.listens_for(Session, 'after_commit')
+def _maybe_collect(session):
+    global _last_gc
+    if not session.info.pop('media_released', False) or time.time() - _last_gc < GC_INTERVAL:
+        return
+    _last_gc = time.time()
+    app = current_app._get_current_object()
+
+    def run():
+        with app.app_context():
+            collect_garbage()
+    threading.Thread(target=run, name='media-gc', daemon=True).start()
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_media_deltas(session, previous_transaction):
+    session.info.pop('media_deltas', None)
+    session.info.pop('media_released', None)
+
+def collect_garbage(grace=GC_GRACE, root=None):
+    """Delete unreferenced objects whose file is older than ``grace`` seconds; returns the count"""
+    root = root or upload_root()
+    cutoff = time.time() - grace
+    removed = 0
+    with db.engine.connect() as conn:
+        keys = conn.execute(select(MediaObject.key).where(MediaObject.refcount <= 0)).scalars().all()
+    for key in keys:
+        path = path_for_key(key, root)
+        try:
+            if os.path.getmtime(path) > cutoff:
+                continue
+        except FileNotFoundError:
+            pass
+        with db.engine.begin() as conn:
+            # Re-check the count: the object may have been referenced again meanwhile
+            deleted = conn.execute(MediaObject.__table__.delete().where(
+                MediaObject.key == key, MediaObject.refcount <= 0
+            )).rowcount
+        if deleted:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            removed += 1
+    if removed:
+        print(f'[MEDIA] Reclaimed {removed} unreferenced files')
+    return removed
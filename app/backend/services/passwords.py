@@ -0,0 +1,168 @@
+"""Password hashing policy and the pool that runs it.
+
+The policy comes from config: ``PASSWORD_HASH_METHOD`` is ``pbkdf2``
+(``PASSWORD_PBKDF2_ITERATIONS``), ``scrypt`` (``PASSWORD_SCRYPT_N/R/P``) or
+``argon2`` (``PASSWORD_ARGON2_*``, needs the optional ``argon2-cffi``
+package). New hashes always use the current policy, and a login whose stored
+hash was made with other parameters is rehashed on the spot, so changing the
+config migrates accounts as their owners sign in. Any hash Werkzeug or
+argon2 can read still verifies.
+
+Hashing is deliberately expensive, so it runs in a small thread pool
+(``PASSWORD_HASH_WORKERS`` threads per gunicorn worker; PBKDF2, scrypt and
+argon2 all release the GIL while they work). At most
+``PASSWORD_HASH_QUEUE`` hashes may be queued or running; past that, or when
+a hash is not done within ``wait_timeout`` seconds, ``Busy`` is raised and
+the API answers 503 with Retry-After instead of letting a login storm starve
+every other request of CPU.
+"""
+import atexit
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from werkzeug.security import check_password_hash, generate_password_hash
+
+try:
+    import argon2
+except ImportError:  # optional dependency, pbkdf2/scrypt need only hashlib
+    argon2 = None
+
+class Busy(Exception):
+    """Raised when the hashing queue is at capacity or a hash waited too long"""
+
+class PasswordHashing:
+    def __init__(self):
+        self.method = 'pbkdf2'
+        self.pbkdf2_iterations = 600000
+        self.scrypt_params = (2**15, 8, 1)
+        self.argon2_params = (2, 19456, 1)  # time cost, memory cost (KiB), parallelism
+        self.workers = os.cpu_count() or 1
+        self.queue_size = self.workers * 8
+        self.wait_timeout = 30
+        self._argon2 = None
+        self._dummy_hash = None
+        self._executor = None
+        self._slots = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.method = app.config.get('PASSWORD_HASH_METHOD', self.method)
+        self.pbkdf2_iterations = app.config.get('PASSWORD_PBKDF2_ITERATIONS', self.pbkdf2_iterations)
+        self.scrypt_params = (
+            app.config.get('PASSWORD_SCRYPT_N', 2**15),
+            app.config.get('PASSWORD_SCRYPT_R', 8),
+            app.config.get('PASSWORD_SCRYPT_P', 1),
+        )
+        self.argon2_params = (
+            app.config.get('PASSWORD_ARGON2_TIME_COST', 2),
+            app.config.get('PASSWORD_ARGON2_MEMORY_COST', 19456),
+            app.config.get('PASSWORD_ARGON2_PARALLELISM', 1),
+        )
+        self.workers = app.config.get('PASSWORD_HASH_WORKERS') or self.workers
+        self.queue_size = app.config.get('PASSWORD_HASH_QUEUE') or self.workers * 8
+        if self.method == 'argon2' and argon2 is None:
+            print('[PASSWORDS] argon2-cffi is not installed, falling back to scrypt')
+            self.method = 'scrypt'
+        self._argon2 = None
+        self._dummy_hash = None
+        app.extensions['password_hashing'] = self
+        atexit.register(self.shutdown)
+
+    # Policy (synchronous; called on pool threads)
+
+    @property
+    def werkzeug_method(self):
+        """The policy as Werkzeug writes it in a hash's first field"""
+        if self.method == 'scrypt':
+            return 'scrypt:{}:{}:{}'.format(*self.scrypt_params)
+        return f'pbkdf2:sha256:{self.pbkdf2_iterations}'
+
+    def _argon2_hasher(self):
+        if self._argon2 is None:
+            time_cost, memory_cost, parallelism = self.argon2_params
+            self._argon2 = argon2.PasswordHasher(
+                time_cost=time_cost, memory_cost=memory_cost, parallelism=parallelism
+            )
+        return self._argon2
+
+    def make_hash(self, password):
+        if self.method == 'argon2':
+            return self._argon2_hasher().hash(password)
+        return generate_password_hash(password, method=self.werkzeug_method)
+
+    def verify(self, stored, password):
+        if stored.startswith('$argon2'):
+            if argon2 is None:
+                print('[PASSWORDS] argon2 hash found but argon2-cffi is not installed')
+                return False
+            try:
+                return argon2.PasswordHasher().verify(stored, password)
+            except (argon2.exceptions.VerificationError, argon2.exceptions.InvalidHashError):
+                return False
+        return check_password_hash(stored, password)
+
+    def needs_rehash(self, stored):
+        if self.method == 'argon2':
+            return not stored.startswith('$argon2') or self._argon2_hasher().check_needs_rehash(stored)
+        return stored.split('$', 1)[0] != self.werkzeug_method
+
+    def _check(self, stored, password):
+        if stored is None:
+            # Unknown account: spend the same time so it cannot be told apart
+            if self._dummy_hash is None:
+                self._dummy_hash = self.make_hash('dummy password')
+            self.verify(self._dummy_hash, password)
+            return False, None
+        if not self.verify(stored, password):
+            return False, None
+        return True, self.make_hash(password) if self.needs_rehash(stored) else None
+
+    # Pool
+
+    def _pool(self):
+        # Threads do not survive fork, so each gunicorn worker starts its own pool
+        if self._executor is not None and self._pid == os.getpid():
+            return self._executor
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='passwords')
+                self._slots = threading.BoundedSemaphore(self.queue_size)
+                self._pid = os.getpid()
+        return self._executor
+
+    def _run(self, fn, *args):
+        executor = self._pool()
+        if not self._slots.acquire(blocking=False):
+            raise Busy()
+        try:
+            future = executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        # The slot is held until the hash itself finishes, not until we stop waiting
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.wait_timeout)
+        except FutureTimeout:
+            future.cancel()  # drops it if still queued; a running hash keeps its slot
+            raise Busy()
+
+    def hash_password(self, password):
+        """Hash ``password`` with the current policy. Raises ``Busy``."""
+        return self._run(self.make_hash, password)
+
+    def check_password(self, stored, password):
+        """Verify ``password`` against ``stored`` (None for an unknown account).
+
+        Returns ``(valid, new_hash)``; ``new_hash`` is set when the stored hash
+        was made with outdated parameters and should replace it. Raises ``Busy``.
+        """
+        return self._run(self._check, stored, password)
+
+    def shutdown(self):
+        if self._executor is not None and self._pid == os.getpid():
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+password_hashing = PasswordHashing()
@@ -0,0 +1,62 @@
+"""Lightweight list-view projection of posts.
+
+List endpoints never need the full post body, so they select only the columns
+a card renders plus a content preview, map rows straight to dicts (no ORM
+identity map, no per-object attribute instrumentation) and load the tags of
+a whole page with one query. The full body is served by GET /api/posts/<id>.
+"""
+from sqlalchemy import func
+from extensions import db
+from models.post import Post, PostTag
+
+PREVIEW_LENGTH = 280
+
+LIST_COLUMNS = (
+    Post.id,
+    Post.user_id,
+    Post.media_url,
+    Post.media_type,
+    Post.media_variants,
+    Post.category,
+    Post.visibility,
+    Post.likes_count,
+    Post.views_count,
+    Post.comments_count,
+    Post.created_at,
+    Post.updated_at,
+)
+
+def list_query(preview_length=PREVIEW_LENGTH):
+    """Query of list columns; one extra preview character flags truncation"""
+    preview = func.substr(Post.content, 1, preview_length + 1).label('content')
+    return db.session.query(*LIST_COLUMNS, preview)
+
+def load_tags(post_ids):
+    """Map post id -> ordered tag list for a page of posts in one query"""
+    tags = {post_id: [] for post_id in post_ids}
+    if post_ids:
+        rows = db.session.query(PostTag.post_id, PostTag.tag).filter(
+            PostTag.post_id.in_(post_ids)
+        ).order_by(PostTag.post_id, PostTag.position)
+        for post_id, tag in rows:
+            tags[post_id].append(tag)
+    return tags
+
+def rows_to_dicts(rows, preview_length=PREVIEW_LENGTH):
+    """Turn ``list_query`` rows into the list-view post dicts"""
+    posts = [dict(row._mapping) for row in rows]
+    tags = load_tags([post['id'] for post in posts])
+    for post in posts:
+        content = post['content'] or ''
+        post['content_truncated'] = len(content) > preview_length
+        post['content'] = content[:preview_length]
+        post['tags'] = tags[post['id']]
+    return posts
+
+def load_posts(post_ids, preview_length=PREVIEW_LENGTH):
+    """List-view dicts for ``post_ids`` in one IN query, keeping the given order"""
+    if not post_ids:
+        return []
+    rows = list_query(preview_length).filter(Post.id.in_(post_ids)).all()
+    posts = {post['id']: post for post in rows_to_dicts(rows, preview_length)}
+    return [posts[post_id] for post_id in post_ids if post_id in posts]
@@ -0,0 +1,126 @@
+"""Full-text search over posts.
+
+Postgres uses a generated ``search_vector`` tsvector column with a GIN index;
+SQLite uses an external-content FTS5 table kept in sync by triggers. Both are
+maintained by the database, so every write path (create_post included) keeps
+the index current without application code. Other engines, or databases where
+the index has not been created yet, fall back to the old ILIKE scan.
+"""
+import re
+from sqlalchemy import text, func, literal_column, table, column, asc, desc, or_
+from extensions import db
+from models.post import Post
+
+SEARCH_LANGUAGE = 'english'
+MAX_SEARCH_TERMS = 8
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+POSTGRES_DDL = [
+    "ALTER TABLE posts ADD COLUMN IF NOT EXISTS search_vector tsvector "
+    "GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('english', coalesce(category, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(content, '')), 'B')"
+    ") STORED",
+    "CREATE INDEX IF NOT EXISTS ix_posts_search_vector ON posts USING gin (search_vector)",
+]
+
+SQLITE_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5("
+    "content, category, content='posts', content_rowid='id', prefix='2 3')",
+    "CREATE TRIGGER IF NOT EXISTS posts_fts_ai AFTER INSERT ON posts BEGIN "
+    "INSERT INTO posts_fts(rowid, content, category) VALUES (new.id, new.content, new.category); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS posts_fts_ad AFTER DELETE ON posts BEGIN "
+    "INSERT INTO posts_fts(posts_fts, rowid, content, category) VALUES ('delete', old.id, old.content, old.category); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS posts_fts_au AFTER UPDATE OF content, category ON posts BEGIN "
+    "INSERT INTO posts_fts(posts_fts, rowid, content, category) VALUES ('delete', old.id, old.content, old.category); "
+    "INSERT INTO posts_fts(rowid, content, category) VALUES (new.id, new.content, new.category); "
+    "END",
+]
+
+posts_fts = table('posts_fts', column('rowid'), column('rank'))
+
+# Engine URL -> detected backend ('postgres', 'sqlite' or None)
+_backends = {}
+
+def ensure_search_index(engine=None):
+    """Create the search column/table, index and triggers if they are missing"""
+    engine = engine or db.engine
+    with engine.begin() as conn:
+        if engine.dialect.name == 'postgresql':
+            for statement in POSTGRES_DDL:
+                conn.execute(text(statement))
+        elif engine.dialect.name == 'sqlite':
+            existed = conn.execute(text(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'posts_fts'"
+            )).first() is not None
+            for statement in SQLITE_DDL:
+                conn.execute(text(statement))
+            if not existed:
+                # Index rows written before the FTS table existed
+                conn.execute(text("INSERT INTO posts_fts(posts_fts) VALUES ('rebuild')"))
+    _backends.pop(str(engine.url), None)
+
+def search_backend():
+    """Return which full-text backend is available on the current engine"""
+    engine = db.engine
+    key = str(engine.url)
+    if key not in _backends:
+        backend = None
+        try:
+            with engine.connect() as conn:
+                if engine.dialect.name == 'postgresql':
+                    found = conn.execute(text(
+                        "SELECT 1 FROM information_schema.columns "
+                        "WHERE table_name = 'posts' AND column_name = 'search_vector'"
+                    )).first()
+                    backend = 'postgres' if found else None
+                elif engine.dialect.name == 'sqlite':
+                    found = conn.execute(text(
+                        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'posts_fts'"
+                    )).first()
+                    backend = 'sqlite' if found else None
+        except Exception as e:
+            print(f'[SEARCH] Could not detect full-text backend: {e}')
+        if backend is None:
+            print('[SEARCH] Full-text index not available, falling back to ILIKE')
+        _backends[key] = backend
+    return _backends[key]
+
+def search_terms(term):
+    """Split user input into plain word tokens safe to embed in a query"""
+    return _TOKEN_RE.findall(term.lower())[:MAX_SEARCH_TERMS]
+
+def apply_search(query, term):
+    """Restrict a Post query to rows matching ``term``.
+
+    Every token is prefix-matched and all tokens must match. Returns
+    ``(query, relevance)`` where ``relevance`` is an ORDER BY clause putting the
+    best matches first, or None when only the ILIKE fallback is available.
+    """
+    terms = search_terms(term)
+    if not terms:
+        return query, None
+
+    backend = search_backend()
+    if backend == 'postgres':
+        vector = literal_column('posts.search_vector')
+        ts_query = func.to_tsquery(SEARCH_LANGUAGE, ' & '.join(f'{t}:*' for t in terms))
+        query = query.filter(vector.op('@@')(ts_query))
+        return query, desc(func.ts_rank(vector, ts_query))
+
+    if backend == 'sqlite':
+        match = ' '.join(f'"{t}"*' for t in terms)
+        query = query.join(posts_fts, posts_fts.c.rowid == Post.id).filter(
+            literal_column('posts_fts').op('MATCH')(match)
+        )
+        # FTS5 rank is bm25(), where lower means more relevant
+        return query, asc(posts_fts.c.rank)
+
+    query = query.filter(or_(
+        Post.content.ilike(f'%{term}%'),
+        Post.category.ilike(f'%{term}%')
+    ))
+    return query, None
@@ -0,0 +1,49 @@
+"""Small dialect-aware SQL helpers"""
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects import postgresql, sqlite
+
+def dialect_insert(table, dialect_name):
+    """Return an INSERT construct supporting ON CONFLICT where the dialect has it"""
+    if dialect_name == 'postgresql':
+        return postgresql.insert(table)
+    if dialect_name == 'sqlite':
+        return sqlite.insert(table)
+    return None
+
+def upsert_counters(conn, table, key_columns, counter, rows):
+    """Add ``row[counter]`` to the matching row of ``table``, inserting it if missing.
+
+    ``rows`` is a list of dicts holding the key columns and the delta. The
+    increment happens in SQL, so concurrent writers never lose updates.
+    """
+    if not rows:
+        return
+    stmt = dialect_insert(table, conn.dialect.name)
+    if stmt is not None:
+        stmt = stmt.on_conflict_do_update(
+            index_elements=key_columns,
+            set_={counter: table.c[counter] + stmt.excluded[counter]}
+        )
+        conn.execute(stmt, rows)
+        return
+    for row in rows:
+        keys = [table.c[name] == row[name] for name in key_columns]
+        result = conn.execute(
+            table.update().where(*keys).values({counter: table.c[counter] + row[counter]})
+        )
+        if result.rowcount == 0:
+            conn.execute(insert(table).values(row))
+
+def insert_ignore(session, table, values, key_columns):
+    """Insert one row unless it already exists; returns True if a row was written"""
+    stmt = dialect_insert(table, session.get_bind().dialect.name)
+    if stmt is not None:
+        result = session.execute(stmt.values(**values).on_conflict_do_nothing(index_elements=key_columns))
+        return result.rowcount == 1
+    try:
+        with session.begin_nested():
+            session.execute(insert(table).values(**values))
+        return True
+    except IntegrityError:
+        return False
@@ -0,0 +1,118 @@
+"""Incrementally maintained tag counters.
+
+Every flush that adds or removes PostTag rows (creating, editing or deleting a
+post) adjusts the all-time TagStat counter and the hourly TagActivity bucket
+of the post's creation time in the same transaction. Reading the leaderboard
+therefore never touches posts: the all-time top-N is an index scan of
+tag_stats and a windowed top-N sums at most one bucket per hour per tag.
+"""
+from collections import Counter
+from datetime import datetime, timedelta
+import time
+from sqlalchemy import event, func, desc
+from sqlalchemy.orm import Session, object_session
+from sqlalchemy.orm.util import identity_key
+from extensions import db
+from models.post import Post, PostTag
+from models.tag_stats import TagStat, TagActivity
+from services.sql import upsert_counters
+
+TAG_WINDOWS = {
+    '24h': timedelta(hours=24),
+    '7d': timedelta(days=7),
+}
+# Keep a little more than the largest window so edits to older posts still land
+ACTIVITY_RETENTION = timedelta(days=8)
+PRUNE_INTERVAL = 3600  # seconds
+
+_last_prune = 0
+
+def hour_bucket(moment):
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+def _post_created_at(session, link):
+    post = link.post
+    if post is None:
+        post = session.identity_map.get(identity_key(Post, link.post_id))
+    return post.created_at if post is not None else None
+
+def _collect(target, delta):
+    session = object_session(target)
+    if session is None:
+        return
+    created_at = _post_created_at(session, target)
+    session.info.setdefault('tag_deltas', []).append((target.tag, created_at, delta))
+
+# Mapper events see every row written, including delete-orphan removals that
+# never show up in session.deleted
+@event.listens_for(PostTag, 'after_insert')
+def _tag_inserted(mapper, connection, target):
+    _collect(target, 1)
+
+@event.listens_for(PostTag, 'after_delete')
+def _tag_deleted(mapper, connection, target):
+    _collect(target, -1)
+
+@event.listens_for(Session, 'after_flush')
+def record_tag_changes(session, flush_context):
+    changes = session.info.pop('tag_deltas', None)
+    if not changes:
+        return
+    totals = Counter()
+    buckets = Counter()
+    oldest = datetime.utcnow() - ACTIVITY_RETENTION
+    for tag, created_at, delta in changes:
+        totals[tag] += delta
+        if created_at is not None and created_at >= oldest:
+            buckets[(hour_bucket(created_at), tag)] += delta
+    totals = {tag: delta for tag, delta in totals.items() if delta}
+    buckets = {key: delta for key, delta in buckets.items() if delta}
+    if not totals and not buckets:
+        return
+
+    conn = session.connection()
+    upsert_counters(conn, TagStat.__table__, ['tag'], 'post_count', [
+        {'tag': tag, 'post_count': delta} for tag, delta in totals.items()
+    ])
+    upsert_counters(conn, TagActivity.__table__, ['bucket', 'tag'], 'post_count', [
+        {'bucket': bucket, 'tag': tag, 'post_count': delta} for (bucket, tag), delta in buckets.items()
+    ])
+    if any(delta < 0 for delta in totals.values()):
+        conn.execute(TagStat.__table__.delete().where(
+            TagStat.tag.in_([tag for tag, delta in totals.items() if delta < 0]),
+            TagStat.post_count <= 0
+        ))
+    _prune_activity(conn)
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_tag_changes(session, previous_transaction):
+    session.info.pop('tag_deltas', None)
+
+def _prune_activity(conn):
+    """Drop expired hourly buckets, at most once per PRUNE_INTERVAL per process"""
+    global _last_prune
+    now = time.time()
+    if now - _last_prune < PRUNE_INTERVAL:
+        return
+    _last_prune = now
+    conn.execute(TagActivity.__table__.delete().where(
+        TagActivity.bucket < hour_bucket(datetime.utcnow() - ACTIVITY_RETENTION)
+    ))
+
+def top_tags(limit=20, window=None):
+    """Return ``[(tag, count), ...]`` for the most used tags.
+
+    ``window`` is one of TAG_WINDOWS, or None for all-time counts.
+    """
+    if window is None:
+        rows = db.session.query(TagStat.tag, TagStat.post_count).filter(
+            TagStat.post_count > 0
+        ).order_by(desc(TagStat.post_count), desc(TagStat.tag)).limit(limit).all()
+        return [(tag, count) for tag, count in rows]
+
+    since = hour_bucket(datetime.utcnow() - TAG_WINDOWS[window])
+    total = func.sum(TagActivity.post_count).label('total')
+    rows = db.session.query(TagActivity.tag, total).filter(
+        TagActivity.bucket >= since
+    ).group_by(TagActivity.tag).having(total > 0).order_by(desc(total)).limit(limit).all()
+    return [(tag, int(count)) for tag, count in rows]
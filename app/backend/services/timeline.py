@@ -0,0 +1,153 @@
+"""Home timelines with fan-out on write.
+
+create_post pushes the new post id into a capped ``timeline_entries`` list
+for every follower with one INSERT ... SELECT over ``follows``. Authors with
+more than ``TIMELINE_FANOUT_MAX_FOLLOWERS`` followers skip the push; their
+recent posts are pulled at read time instead and merged in. Reading a page is
+then one index range scan on (user_id, created_at, post_id), an optional
+lookup for those prolific authors, and one batched hydrate of the posts.
+"""
+from flask import current_app
+from sqlalchemy import and_, or_, desc, insert, literal, select, func, tuple_
+from extensions import db
+from models.feed import Follow, FollowStat, TimelineEntry
+from models.post import Post
+from services import post_list
+from services.sql import insert_ignore, upsert_counters
+
+DEFAULT_FANOUT_MAX_FOLLOWERS = 5000
+DEFAULT_TIMELINE_MAX_ENTRIES = 800
+TRIM_EVERY = 20  # trim follower timelines on one in N fanned-out posts
+FOLLOW_BACKFILL = 50  # recent posts copied into a timeline on follow
+
+def _setting(name, default):
+    return current_app.config.get(name, default)
+
+def follower_count(user_id):
+    count = db.session.query(FollowStat.follower_count).filter(FollowStat.user_id == user_id).scalar()
+    return count or 0
+
+def fan_out(post):
+    """Push a flushed post into its author's and followers' timelines"""
+    db.session.execute(insert(TimelineEntry).values(
+        user_id=post.user_id, post_id=post.id, created_at=post.created_at
+    ))
+    if post.visibility == 'private':
+        return 0
+    if follower_count(post.user_id) > _setting('TIMELINE_FANOUT_MAX_FOLLOWERS', DEFAULT_FANOUT_MAX_FOLLOWERS):
+        # Prolific author: followers pull these posts on read
+        return 0
+
+    result = db.session.execute(insert(TimelineEntry).from_select(
+        ['user_id', 'post_id', 'created_at'],
+        select(Follow.follower_id, literal(post.id), literal(post.created_at))
+        .where(Follow.followee_id == post.user_id, Follow.follower_id != post.user_id)
+    ))
+    if post.id % TRIM_EVERY == 0:
+        trim_timelines(select(Follow.follower_id).where(Follow.followee_id == post.user_id))
+    return result.rowcount
+
+def trim_timelines(user_ids):
+    """Drop entries beyond the newest TIMELINE_MAX_ENTRIES for each user"""
+    ranked = select(
+        TimelineEntry.user_id,
+        TimelineEntry.post_id,
+        func.row_number().over(
+            partition_by=TimelineEntry.user_id,
+            order_by=(desc(TimelineEntry.created_at), desc(TimelineEntry.post_id))
+        ).label('rank')
+    ).where(TimelineEntry.user_id.in_(user_ids)).subquery()
+    overflow = select(ranked.c.user_id, ranked.c.post_id).where(
+        ranked.c.rank > _setting('TIMELINE_MAX_ENTRIES', DEFAULT_TIMELINE_MAX_ENTRIES)
+    )
+    db.session.execute(TimelineEntry.__table__.delete().where(
+        tuple_(TimelineEntry.user_id, TimelineEntry.post_id).in_(overflow)
+    ))
+
+def follow(follower_id, followee_id):
+    """Follow an author and backfill their recent posts; False if already following"""
+    created = insert_ignore(db.session, Follow.__table__, {
+        'follower_id': follower_id, 'followee_id': followee_id
+    }, ['follower_id', 'followee_id'])
+    if not created:
+        return False
+    upsert_counters(db.session.connection(), FollowStat.__table__, ['user_id'], 'follower_count', [
+        {'user_id': followee_id, 'follower_count': 1}
+    ])
+    recent = select(Post.id, Post.created_at).where(
+        Post.user_id == followee_id, Post.visibility != 'private'
+    ).order_by(desc(Post.created_at), desc(Post.id)).limit(FOLLOW_BACKFILL).subquery()
+    db.session.execute(insert(TimelineEntry).from_select(
+        ['user_id', 'post_id', 'created_at'],
+        select(literal(follower_id), recent.c.id, recent.c.created_at).where(
+            ~select(TimelineEntry.post_id).where(
+                TimelineEntry.user_id == follower_id, TimelineEntry.post_id == recent.c.id
+            ).exists()
+        )
+    ))
+    return True
+
+def unfollow(follower_id, followee_id):
+    """Stop following and remove the author's posts from the timeline"""
+    result = db.session.execute(Follow.__table__.delete().where(
+        Follow.follower_id == follower_id, Follow.followee_id == followee_id
+    ))
+    if result.rowcount != 1:
+        return False
+    upsert_counters(db.session.connection(), FollowStat.__table__, ['user_id'], 'follower_count', [
+        {'user_id': followee_id, 'follower_count': -1}
+    ])
+    db.session.execute(TimelineEntry.__table__.delete().where(
+        TimelineEntry.user_id == follower_id,
+        TimelineEntry.post_id.in_(select(Post.id).where(Post.user_id == followee_id))
+    ))
+    return True
+
+def _before(created_col, id_col, cursor):
+    created_at, post_id = cursor
+    return or_(created_col < created_at, and_(created_col == created_at, id_col < post_id))
+
+def timeline_post_ids(user_id, limit, cursor=None):
+    """Return up to ``limit`` timeline post ids, newest first.
+
+    ``cursor`` is the (created_at, post_id) of the last post already seen.
+    """
+    entries = db.session.query(TimelineEntry.created_at, TimelineEntry.post_id).filter(
+        TimelineEntry.user_id == user_id
+    )
+    if cursor:
+        entries = entries.filter(_before(TimelineEntry.created_at, TimelineEntry.post_id, cursor))
+    candidates = entries.order_by(
+        desc(TimelineEntry.created_at), desc(TimelineEntry.post_id)
+    ).limit(limit).all()
+
+    # Fan-out-on-read for followed authors that are too prolific to push
+    prolific = db.session.query(Follow.followee_id).join(
+        FollowStat, FollowStat.user_id == Follow.followee_id
+    ).filter(
+        Follow.follower_id == user_id,
+        FollowStat.follower_count > _setting('TIMELINE_FANOUT_MAX_FOLLOWERS', DEFAULT_FANOUT_MAX_FOLLOWERS)
+    )
+    pulled = db.session.query(Post.created_at, Post.id).filter(
+        Post.user_id.in_(prolific), Post.visibility != 'private'
+    )
+    if cursor:
+        pulled = pulled.filter(_before(Post.created_at, Post.id, cursor))
+    candidates += pulled.order_by(desc(Post.created_at), desc(Post.id)).limit(limit).all()
+
+    ordered = []
+    seen = set()
+    for created_at, post_id in sorted(candidates, key=lambda row: (row[0], row[1]), reverse=True):
+        if post_id not in seen:
+            seen.add(post_id)
+            ordered.append(post_id)
+    return ordered[:limit]
+
+def hydrate_posts(post_ids):
+    """Load list-view post dicts for ``post_ids``, keeping the given order"""
+    return post_list.load_posts(post_ids)
+
+def read_timeline(user_id, limit, cursor=None):
+    """Return ``(posts, has_next)`` for one newest-first page of the home timeline (list-view dicts)"""
+    post_ids = timeline_post_ids(user_id, limit + 1, cursor)
+    return hydrate_posts(post_ids[:limit]), len(post_ids) > limit
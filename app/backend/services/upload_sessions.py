@@ -0,0 +1,199 @@
+"""Resumable chunked uploads for post media.
+
+A client opens a session with the file's name, size and (optionally) its
+SHA-256, then PUTs the bytes in any number of chunks, each tagged with the
+offset it starts at. Chunks are streamed from the request body straight into
+``upload_root()/tmp/<id>.part`` and the session offset is advanced with a
+conditional UPDATE, so a retried or duplicated chunk is answered with the
+current offset instead of being appended twice. If the connection drops
+mid-chunk, the bytes that did arrive are kept and the client resumes from
+the recorded offset. The first chunk is sniffed as it arrives (see
+``services.ingest``), so a wrong file type or an oversized image is refused
+before the rest of the file is sent.
+
+Completing a session hashes the part file once for both the checksum check
+and the media store key, then moves it into the content-addressed store. The
+finished session holds a reference to the object (``media_url`` is counted
+like a post's) until a post is created from it or the session expires.
+"""
+import hashlib
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+from werkzeug.exceptions import ClientDisconnected
+from extensions import db
+from models.media import UploadSession
+from services.ingest import Sniffer, UploadRejected, HEADER_LIMIT, IMAGE_FORMATS, VIDEO_FORMATS
+from services.media_store import upload_root, store_file, url_for_key, COPY_CHUNK_SIZE
+
+MAX_CHUNK_SIZE = 8 * 1024 * 1024
+MAX_PENDING_SESSIONS = 10  # per user
+SESSION_TTL = timedelta(hours=24)
+PURGE_INTERVAL = 3600  # seconds
+MEDIA_FORMATS = IMAGE_FORMATS + VIDEO_FORMATS
+
+_last_purge = 0
+
+class UploadError(Exception):
+    """A rejected upload request; ``status`` is the HTTP status to answer with"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+def part_path(session_id):
+    return os.path.join(upload_root(), 'tmp', f'{session_id}.part')
+
+def parse_checksum(value):
+    """Normalise ``sha256:<hex>`` (or bare hex) to ``sha256:<hex>``; None if missing"""
+    if not value:
+        return None
+    value = value.strip().lower()
+    digest = value[len('sha256:'):] if value.startswith('sha256:') else value
+    if len(digest) != 64 or any(c not in '0123456789abcdef' for c in digest):
+        raise UploadError('checksum must be sha256:<64 hex digits>.')
+    return f'sha256:{digest}'
+
+def create_session(user_id, filename, size, checksum=None, max_size=None):
+    """Open a session and its empty part file; the caller commits"""
+    if max_size is not None and size > max_size:
+        raise UploadError(f'File exceeds the {max_size // (1024 * 1024)}MB limit.', 413)
+    pending = UploadSession.query.filter_by(user_id=user_id, status='pending').count()
+    if pending >= MAX_PENDING_SESSIONS:
+        raise UploadError('Too many unfinished uploads.', 429)
+    session = UploadSession(
+        id=str(uuid.uuid4()),
+        user_id=user_id,
+        filename=filename,
+        size=size,
+        offset=0,
+        checksum=parse_checksum(checksum),
+        status='pending'
+    )
+    path = part_path(session.id)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, 'wb').close()
+    db.session.add(session)
+    return session
+
+def write_chunk(session, offset, stream, length):
+    """Append ``length`` bytes from ``stream`` at ``offset``; returns the new offset.
+
+    The offset must equal the session's current offset (409 otherwise) and the
+    chunk may not run past the declared size (413). Commits the new offset.
+    """
+    if session.status != 'pending':
+        raise UploadError('Upload is already complete.', 409)
+    if offset != session.offset:
+        raise UploadError('Offset does not match the upload.', 409)
+    if length is None:
+        raise UploadError('Content-Length is required.', 411)
+    if length > MAX_CHUNK_SIZE:
+        raise UploadError(f'Chunks are limited to {MAX_CHUNK_SIZE // (1024 * 1024)}MB.', 413)
+    if offset + length > session.size:
+        raise UploadError('Chunk runs past the declared file size.', 413)
+
+    written = 0
+    disconnected = False
+    # Chunks inside the header window are checked against the bytes before them
+    sniffer = Sniffer(MEDIA_FORMATS) if offset < HEADER_LIMIT else None
+    with open(part_path(session.id), 'r+b') as out:
+        if sniffer and offset:
+            sniffer.feed(out.read(offset))
+        out.seek(offset)
+        # Drop anything left past the offset by an earlier, unrecorded write
+        out.truncate()
+        try:
+            while written < length:
+                chunk = stream.read(min(COPY_CHUNK_SIZE, length - written))
+                if not chunk:
+                    break
+                if sniffer:
+                    sniffer.feed(chunk)
+                out.write(chunk)
+                written += len(chunk)
+        except ClientDisconnected:
+            disconnected = True
+        except UploadRejected as e:
+            out.truncate(offset)
+            raise UploadError(e.message, e.status)
+        out.flush()
+        os.fsync(out.fileno())
+
+    new_offset = offset + written
+    # Only the writer that still sees the old offset may advance it
+    advanced = db.session.query(UploadSession).filter(
+        UploadSession.id == session.id,
+        UploadSession.offset == offset,
+        UploadSession.status == 'pending'
+    ).update({'offset': new_offset, 'updated_at': datetime.utcnow()}, synchronize_session=False)
+    db.session.commit()
+    if not advanced:
+        raise UploadError('Offset does not match the upload.', 409)
+    if disconnected:
+        print(f'[UPLOADS] Session {session.id} interrupted at {new_offset}/{session.size}')
+    return new_offset
+
+def _reset(session, path):
+    open(path, 'wb').close()
+    session.offset = 0
+    db.session.commit()
+
+def complete_session(session, checksum=None):
+    """Verify the finished part file and move it into the media store; the caller commits"""
+    if session.status == 'complete':
+        return session
+    if session.offset != session.size:
+        raise UploadError('Upload is not finished.', 409)
+    expected = parse_checksum(checksum) or session.checksum
+    path = part_path(session.id)
+
+    sha256 = hashlib.sha256()
+    blake = hashlib.blake2b(digest_size=32)
+    sniffer = Sniffer(MEDIA_FORMATS)
+    # Start over rather than keep bytes that are known to be wrong
+    try:
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(COPY_CHUNK_SIZE), b''):
+                sniffer.feed(chunk)
+                sha256.update(chunk)
+                blake.update(chunk)
+        sniffed = sniffer.finish()
+    except UploadRejected as e:
+        _reset(session, path)
+        raise UploadError(e.message, e.status)
+    if expected and expected != f'sha256:{sha256.hexdigest()}':
+        _reset(session, path)
+        raise UploadError('Checksum mismatch; the upload has been reset.', 422)
+
+    session.media_url = url_for_key(store_file(path, sniffed.ext, digest=blake.hexdigest()))
+    session.checksum = f'sha256:{sha256.hexdigest()}'
+    session.status = 'complete'
+    return session
+
+def discard_session(session):
+    """Delete a session and its part file; the caller commits"""
+    try:
+        os.remove(part_path(session.id))
+    except FileNotFoundError:
+        pass
+    db.session.delete(session)
+
+def purge_expired(force=False):
+    """Drop sessions idle for longer than SESSION_TTL, at most once per PURGE_INTERVAL"""
+    global _last_purge
+    if not force and time.time() - _last_purge < PURGE_INTERVAL:
+        return 0
+    _last_purge = time.time()
+    expired = UploadSession.query.filter(
+        UploadSession.updated_at < datetime.utcnow() - SESSION_TTL
+    ).all()
+    # Deleted through the ORM so completed sessions release their media reference
+    for session in expired:
+        discard_session(session)
+    if expired:
+        db.session.commit()
+        print(f'[UPLOADS] Purged {len(expired)} expired upload sessions')
+    return len(expired)
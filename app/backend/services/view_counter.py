@@ -0,0 +1,102 @@
+"""Write-behind buffer for post view counts.
+
+Full reads of a post (GET /api/posts/<id> answered with a body, not a 304
+and not a feed page) call ``view_counter.record(post_ids)``, which only
+bumps an in-memory counter. A per-worker daemon thread folds the buffer into posts.views_count
+every ``VIEW_FLUSH_INTERVAL`` seconds (or sooner once ``VIEW_MAX_PENDING``
+posts are pending) with one ``UPDATE ... CASE`` per chunk, and the buffer is
+flushed again at interpreter exit. A crash loses at most one interval of
+views; reads never write to the database themselves.
+"""
+from collections import Counter
+import atexit
+import os
+import threading
+from sqlalchemy import case, func, update
+
+FLUSH_CHUNK_SIZE = 500
+
+class ViewCounter:
+    def __init__(self):
+        self.app = None
+        self.enabled = True
+        self.flush_interval = 10
+        self.max_pending = 5000
+        self._pending = Counter()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._pid = None
+
+    def init_app(self, app):
+        self.app = app
+        self.enabled = app.config.get('VIEW_TRACKING_ENABLED', True)
+        self.flush_interval = app.config.get('VIEW_FLUSH_INTERVAL', 10)
+        self.max_pending = app.config.get('VIEW_MAX_PENDING', 5000)
+        app.extensions['view_counter'] = self
+        atexit.register(self.flush)
+
+    def record(self, post_ids):
+        """Count one view for each id; never touches the database"""
+        if not self.enabled or self.app is None:
+            return
+        with self._lock:
+            self._pending.update(post_ids)
+            pending = len(self._pending)
+        self._ensure_thread()
+        if pending >= self.max_pending:
+            self._wake.set()
+
+    def _ensure_thread(self):
+        # Threads do not survive fork, so each gunicorn worker starts its own
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='view-counter-flush', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self):
+        """Write pending views; returns the number of posts updated"""
+        with self._lock:
+            batch, self._pending = self._pending, Counter()
+        if not batch or self.app is None:
+            return 0
+
+        from extensions import db
+        from models.post import Post
+        # Ascending ids keep row lock order consistent across workers
+        items = sorted(batch.items())
+        with self.app.app_context():
+            try:
+                for start in range(0, len(items), FLUSH_CHUNK_SIZE):
+                    chunk = dict(items[start:start + FLUSH_CHUNK_SIZE])
+                    db.session.execute(
+                        update(Post)
+                        .where(Post.id.in_(list(chunk)))
+                        .values(
+                            views_count=func.coalesce(Post.views_count, 0) + case(chunk, value=Post.id, else_=0),
+                            updated_at=Post.updated_at
+                        )
+                        .execution_options(synchronize_session=False)
+                    )
+                db.session.commit()
+                return len(items)
+            except Exception as e:
+                db.session.rollback()
+                print(f'[VIEWS] Flush of {len(items)} posts failed, keeping them for the next run: {e}')
+                with self._lock:
+                    self._pending.update(batch)
+                return 0
+            finally:
+                db.session.remove()
+
+view_counter = ViewCounter()
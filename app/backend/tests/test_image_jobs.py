@@ -0,0 +1,51 @@
+"""ImageProcessor: recovery from a worker process that dies.
+
+Run from app/backend:  python -m pytest -q tests
+"""
+import os
+import sys
+import threading
+from concurrent.futures.process import BrokenProcessPool
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+from services.image_jobs import ImageProcessor
+
+def run(processor, fn, *args):
+    """Submit through ``processor`` and wait for the completion callback"""
+    done = threading.Event()
+    outcome = {}
+    def on_done(result, error):
+        outcome.update(result=result, error=error)
+        done.set()
+    processor.submit(fn, *args, on_done=on_done)
+    assert done.wait(60), 'completion callback never ran'
+    return outcome['result'], outcome['error']
+
+def test_pool_recovers_after_worker_dies():
+    processor = ImageProcessor()
+    processor.workers, processor.queue_size = 1, 4
+    try:
+        assert run(processor, pow, 2, 10) == (1024, None)
+        broken = processor._executor
+
+        # A child that exits mid-job (like an OOM kill) breaks the whole pool
+        result, error = run(processor, os._exit, 1)
+        assert result is None and isinstance(error, BrokenProcessPool)
+
+        assert run(processor, pow, 3, 3) == (27, None)
+        assert processor._executor is not broken
+        # Every slot came back, including the crashed job's
+        assert processor._slots._value == processor.queue_size
+    finally:
+        processor.shutdown()
+
+def test_submit_retries_on_a_pool_broken_before_it_noticed():
+    processor = ImageProcessor()
+    processor.workers, processor.queue_size = 1, 4
+    try:
+        processor._pool()._broken = 'a child process terminated abruptly'
+        assert run(processor, pow, 2, 5) == (32, None)
+    finally:
+        processor.shutdown()
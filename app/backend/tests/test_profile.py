@@ -0,0 +1,103 @@
+"""GET/PUT /api/profile: query count of the cache-miss load and payload parity.
+
+Run from app/backend:  python -m pytest -q tests
+"""
+import os
+import sys
+import tempfile
+import pytest
+from sqlalchemy import event
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+PROFILE_UPDATE = {
+    'name': 'Ada Lovelace',
+    'title': 'Engineer',
+    'skills': ['python', 'sql'],
+    'socials': {'github': 'ada'},
+    'experiences': [
+        {'title': 'Analyst', 'company': 'Engine Co', 'start_date': '2020-01-01', 'end_date': '2021-06-30'},
+        {'title': 'Engineer', 'company': 'Engine Co', 'start_date': '2021-07-01'},
+    ],
+    'education': [{'school': 'University', 'degree': 'BSc', 'field': 'Mathematics', 'start_date': '2016-09-01'}],
+}
+
+@pytest.fixture(scope='module')
+def app():
+    os.environ.setdefault('FLASK_ENV', 'production')
+    os.environ.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'test.db'))
+    os.environ['CACHE_BACKEND'] = 'memory'
+    os.environ['PASSWORD_PBKDF2_ITERATIONS'] = '1000'
+    from main import app
+    from extensions import db
+    app.config['TESTING'] = True
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.drop_all()
+
+@pytest.fixture(scope='module')
+def auth(app):
+    response = app.test_client().post('/api/auth/signup', json={
+        'username': 'ada', 'email': 'ada@example.com', 'password': 'Analytical1'
+    })
+    assert response.status_code == 201
+    body = response.get_json()
+    return body['user']['id'], {'Authorization': f"Bearer {body['token']}"}
+
+def count_statements(app, fn):
+    from extensions import db
+    statements = []
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        result = fn()
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    return result, statements
+
+def test_put_response_matches_get(app, auth):
+    user_id, headers = auth
+    client = app.test_client()
+    put = client.put('/api/profile', json=PROFILE_UPDATE, headers=headers)
+    assert put.status_code == 200
+    get = client.get('/api/profile', headers=headers)
+    assert get.status_code == 200
+    profile = get.get_json()['user']['profile']
+    assert put.get_json()['profile'] == profile
+    assert [exp['start_date'] for exp in profile['experiences']] == ['2020-01-01', '2021-07-01']
+
+def test_cache_miss_profile_load_is_two_queries(app, auth):
+    from extensions import cache
+    from services.identity import identity_cache
+    user_id, headers = auth
+    client = app.test_client()
+    client.put('/api/profile', json=PROFILE_UPDATE, headers=headers)
+    with app.app_context():
+        cache.invalidate(f'user:{user_id}')
+        # Re-warm the token's identity so only the profile load is counted
+        identity_cache.get(user_id)
+
+    response, statements = count_statements(app, lambda: client.get('/api/profile', headers=headers))
+    assert response.status_code == 200
+    assert len(response.get_json()['user']['profile']['experiences']) == 2
+    # users + profile + experiences in one JOIN, education in one selectin query
+    assert len(statements) <= 2, statements
+
+    # A warm cache answers without touching the database at all
+    response, statements = count_statements(app, lambda: client.get('/api/profile', headers=headers))
+    assert response.status_code == 200
+    assert statements == []
+
+def test_revalidation_is_not_modified(app, auth):
+    user_id, headers = auth
+    client = app.test_client()
+    etag = client.get('/api/profile', headers=headers).headers['ETag']
+    response = client.get('/api/profile', headers={**headers, 'If-None-Match': etag})
+    assert response.status_code == 304